@@ -0,0 +1,231 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np  # noqa: E402
+
+from benchmarks.synthetic import SCALES, generate  # noqa: E402
+from serve import PAGES as APP_PAGES, open_page, warm_up  # noqa: E402
+
+# Many sessions using the dashboard at once in one server process. Each
+# session is an AppTest of streamlit_app.py on its own thread, all started
+# together, that opens a page and then repeatedly toggles each raw data
+# checkbox and narrows and resets the series filters. Every rerun is timed;
+# each concurrency level runs in a fresh process, so its peak resident
+# memory is its own.
+#
+#     python -m benchmarks.load --scale medium --sessions 1 5 10 25 50
+#     python -m benchmarks.load --cold --sessions 50    # everyone arrives after a restart
+
+# The SQL page has no checkboxes or filters to script
+PAGES = [page for page in APP_PAGES if page != 'sql']
+
+PERCENTILES = (50, 95, 99)
+
+
+class SessionFailed(Exception):
+    pass
+
+
+# One scripted session on `page`. Appends (action, seconds) per rerun to
+# `latencies`; filter choices are drawn from `rng`, so sessions select
+# different series.
+def run_session(page, rng, rounds, latencies):
+    at = open_page(page)
+
+    def rerun(action, target):
+        started = time.perf_counter()
+        target.run()
+        latencies.append((action, time.perf_counter() - started))
+        if at.exception:
+            raise SessionFailed(f"{page}, {action}: {at.exception[0].message}")
+
+    rerun("open", at)
+    for _ in range(rounds):
+        for label in [checkbox.label for checkbox in at.checkbox]:
+            for toggle in ("check", "uncheck"):
+                checkbox = next(checkbox for checkbox in at.checkbox if checkbox.label == label)
+                rerun("raw data", getattr(checkbox, toggle)())
+
+        filters = [widget.key for widget in at.multiselect if "_filter_" in (widget.key or "")]
+        for key in filters:
+            options = at.multiselect(key=key).options
+            rerun("filter", at.multiselect(key=key).set_value(
+                rng.sample(options, min(len(options), rng.randint(1, 3)))))
+        years = [widget.key for widget in at.slider if (widget.key or "").endswith("_filter_years")]
+        for key in years:
+            first, last = at.slider(key=key).min, at.slider(key=key).max
+            start = rng.randint(first, last)
+            rerun("years", at.slider(key=key).set_value((start, min(start + 10, last))))
+        if filters or years:
+            for key in filters:
+                at.multiselect(key=key).set_value([])
+            for key in years:
+                at.slider(key=key).set_value((at.slider(key=key).min, at.slider(key=key).max))
+            rerun("reset filters", at)
+
+
+# AppTest installs a mock Runtime for each run and removes it when the run
+# ends, which pulls it from under any other session still running. For the
+# load test, one mock runtime built the same way stays installed throughout,
+# and AppTest's own install and removal go to a stand-in. Sessions also share
+# one compiled script, as they do in a server, instead of each run compiling
+# its own.
+@contextmanager
+def shared_runtime():
+    from unittest.mock import MagicMock, patch
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import patch_config_options
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    script_cache = ScriptCache()
+    with patch.object(app_test, "Runtime", type("Runtime", (), {})), \
+            patch.object(Runtime, "_instance", runtime), \
+            patch.object(app_test, "ScriptCache", lambda: script_cache), \
+            patch.object(local_script_runner, "ScriptCache", lambda: script_cache), \
+            patch_config_options({"global.appTest": True}):
+        yield
+
+
+# Run `sessions` sessions at once (spread over `pages`) in this process and
+# return their rerun latencies, throughput and the process's peak memory
+def measure(data_dir, sessions, pages, rounds, seed, cold):
+    logging.disable(logging.WARNING)  # AppTest's bare-mode "no runtime" notices
+    os.chdir(data_dir)
+    if not cold:
+        warm_up()  # As serve.py leaves the server before its first session
+        logging.disable(logging.WARNING)
+
+    latencies, errors = [], []
+    start = threading.Barrier(sessions + 1)
+
+    def session(number):
+        start.wait()
+        try:
+            run_session(pages[number % len(pages)], random.Random(seed + number), rounds,
+                        latencies)
+        except Exception as exc:
+            errors.append(f"{type(exc).__name__}: {exc}")
+
+    threads = [threading.Thread(target=session, args=(number,), name=f"session-{number}")
+               for number in range(sessions)]
+    with shared_runtime():
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    by_action = defaultdict(list)
+    for action, seconds in latencies:
+        by_action[action].append(seconds)
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "latency": percentiles([seconds for _, seconds in latencies]),
+        "actions": {action: percentiles(samples) for action, samples in by_action.items()},
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,  # KiB on Linux
+    }
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    return {f"p{q}": float(value) for q, value in
+            zip(PERCENTILES, np.percentile(samples, PERCENTILES))}
+
+
+# Build the Parquet caches once, so every level starts from the same disk state
+def prepare(data_dir):
+    logging.disable(logging.WARNING)
+    os.chdir(data_dir)
+    warm_up()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load-test the dashboard with concurrent scripted sessions.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default='small',
+                        help="synthetic data size (ignored with --data)")
+    parser.add_argument("--data", help="directory with exports to use instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25],
+                        help="concurrency levels, each run in a fresh server process")
+    parser.add_argument("--pages", nargs="+", choices=APP_PAGES, default=PAGES,
+                        help="pages the sessions open, assigned round-robin")
+    parser.add_argument("--rounds", type=int, default=2,
+                        help="times each session repeats its interactions")
+    parser.add_argument("--cold", action="store_true",
+                        help="start each level with empty in-process caches instead of "
+                             "warmed up as by serve.py")
+    parser.add_argument("--output", help="also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    work_dir = None
+    if args.data:
+        data_dir = os.path.abspath(args.data)
+    else:
+        work_dir = data_dir = tempfile.mkdtemp(prefix="nass-load-")
+        generate(data_dir, SCALES[args.scale], args.seed)
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    print(f"{'sessions':>8} {'reruns':>7} {'errors':>6} "
+          + " ".join(f"{f'p{q}':>8}" for q in PERCENTILES)
+          + f" {'reruns/s':>9} {'peak RSS':>9}", flush=True)
+    try:
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            pool.submit(prepare, data_dir).result()
+        for sessions in args.sessions:
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                result = pool.submit(measure, data_dir, sessions, args.pages, args.rounds,
+                                     args.seed, args.cold).result()
+            results.append(result)
+            print(f"{sessions:>8} {result['reruns']:>7} {len(result['errors']):>6} "
+                  + " ".join(f"{result['latency'].get(f'p{q}', float('nan')) * 1000:>6.0f}ms"
+                             for q in PERCENTILES)
+                  + f" {result['throughput']:>9.1f} {result['peak_rss'] / 2**20:>7.0f}MB",
+                  flush=True)
+            for error in sorted(set(result['errors'])):
+                print(f"         {error}")
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(json.dumps({"scale": None if args.data else args.scale, "data": args.data,
+                                "seed": args.seed, "pages": args.pages, "rounds": args.rounds,
+                                "cold": args.cold, "results": results}, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
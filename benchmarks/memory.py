@@ -0,0 +1,99 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import SCALES, generate  # noqa: E402
+from nass_data import DATASETS, frame_nbytes, load_dataset  # noqa: E402
+from nass_profile import rss_bytes  # noqa: E402
+
+# Per-process memory of the loaded datasets with many sessions connected.
+# Each layout is measured in a fresh process: the datasets are loaded once,
+# then every simulated session fetches them through the dashboard's cache.
+#
+#     python -m benchmarks.memory --scale medium --sessions 40
+
+LAYOUTS = {
+    # Whole export as pandas reads it, one unpickled copy per session
+    # (st.cache_data), as the dashboard used to load it
+    'export': "all export columns, copied per session",
+    # Compact typed frame, still copied per session
+    'copied': "typed frame, copied per session",
+    # Compact typed frame held once per process (st.cache_resource)
+    'shared': "typed frame, shared by sessions",
+}
+
+
+def measure(data_dir, layout, sessions):
+    import pandas as pd
+    import streamlit as st
+
+    logging.disable(logging.WARNING)  # Bare-mode "no runtime" notices
+    os.chdir(data_dir)
+    if layout == 'export':
+        load = st.cache_data(lambda name: pd.read_csv(DATASETS[name].path))
+    elif layout == 'copied':
+        load = st.cache_data(lambda name: load_dataset(name))
+    else:
+        load = st.cache_resource(lambda name: load_dataset(name))
+    for name in DATASETS:
+        load_dataset(name)  # Build the Parquet caches before measuring
+
+    started = rss_bytes()
+    frames = [load(name) for name in DATASETS]
+    loaded = rss_bytes()
+    held = [[load(name) for name in DATASETS] for _ in range(sessions)]
+    in_use = rss_bytes()
+    del held
+    return {
+        "columns": sum(len(df.columns) for df in frames),
+        "frame_bytes": sum(frame_nbytes(df) for df in frames),
+        "loaded": loaded - started,
+        "sessions": in_use - started,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report per-process dataset memory.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default='medium',
+                        help="synthetic data size (ignored with --data)")
+    parser.add_argument("--data", help="directory with exports to use instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sessions", type=int, default=40)
+    args = parser.parse_args(argv)
+
+    if rss_bytes() is None:
+        parser.error("resident memory can only be measured where /proc is available")
+
+    work_dir = None
+    if args.data:
+        data_dir = os.path.abspath(args.data)
+    else:
+        work_dir = data_dir = tempfile.mkdtemp(prefix="nass-memory-")
+        generate(data_dir, SCALES[args.scale], args.seed)
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'layout':40} {'columns':>7} {'frames':>9} {'loaded':>9} "
+          f"{f'{args.sessions} sessions':>12} {'per session':>11}")
+    try:
+        for layout, label in LAYOUTS.items():
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                result = pool.submit(measure, data_dir, layout, args.sessions).result()
+            per_session = (result["sessions"] - result["loaded"]) / max(args.sessions, 1)
+            print(f"{label:40} {result['columns']:>7} {result['frame_bytes'] / 2**20:>7.1f}MB "
+                  f"{result['loaded'] / 2**20:>7.1f}MB {result['sessions'] / 2**20:>10.1f}MB "
+                  f"{per_session / 2**20:>9.2f}MB")
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np  # noqa: E402
+import pyarrow as pa  # noqa: E402
+
+import nass_figures  # noqa: E402
+from benchmarks.synthetic import SCALES, SUPPRESSION_CODES, generate  # noqa: E402
+from nass_data import (  # noqa: E402
+    CACHE_DIR,
+    DATASETS,
+    load_dataset,
+    parse_values,
+    read_filtered_table,
+    to_clean_frame,
+    to_typed_frame,
+)
+from nass_stats import latest_year_rows, summarize_series  # noqa: E402
+from precompute import DATASETS as SERIES, FIGURES  # noqa: E402
+from serve import PAGES, open_page  # noqa: E402
+
+# Times each stage of the dashboard separately on synthetic (or given)
+# exports and writes the results as JSON, so runs on different commits can be
+# compared with --compare.
+#
+#     python -m benchmarks.run --scale medium --output bench.json
+#     python -m benchmarks.run --scale medium --compare bench.json
+
+RESULTS_SCHEMA = 1
+
+
+# Run `function` `repeat` times after `warmup` untimed calls (imports, first
+# allocations); returns its last result and the timings in seconds
+def _timed(function, repeat, warmup=1):
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started)
+    return result, samples
+
+
+def _clear_parquet_cache(name):
+    for suffix in (".parquet", ".json"):
+        path = os.path.join(CACHE_DIR, name + suffix)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def bench_datasets(repeat):
+    results = {}
+    for name, spec in DATASETS.items():
+        raw, results[f"csv_load/{name}"] = _timed(lambda: read_filtered_table(spec), repeat)
+
+        def clean():
+            return to_typed_frame(to_clean_frame(pa.Table.from_pandas(raw, preserve_index=False)))
+
+        _, results[f"value_cleaning/{name}"] = _timed(clean, repeat)
+
+        def build_cache():  # CSV to typed Parquet copy, as on first start
+            _clear_parquet_cache(name)
+            return load_dataset(name)
+
+        _, results[f"cache_build/{name}"] = _timed(build_cache, repeat)
+        df, results[f"cache_read/{name}"] = _timed(lambda: load_dataset(name), repeat)
+
+        series_col = SERIES[name][0]
+        _, results[f"summary/{name}"] = _timed(lambda: summarize_series(df, series_col), repeat)
+    return results
+
+
+# The value parser alone on `rows` county-style values: thousands-separated
+# numbers and decimals with 2% suppression codes
+def bench_parser(repeat, rows):
+    rng = np.random.default_rng(0)
+    pool = np.concatenate((
+        np.char.mod('%.2f', rng.uniform(0, 20, 50_000)),
+        [f"{value:,}" for value in rng.integers(0, 50_000, 50_000)],
+    ))
+    values = pa.array(pool).take(pa.array(rng.integers(0, len(pool), rows)))
+    suppressed = pa.array(rng.random(rows) < 0.02)
+    codes = pa.array(rng.choice(SUPPRESSION_CODES, rows))
+    values = pa.compute.if_else(suppressed, codes, values)
+    _, samples = _timed(lambda: parse_values(values), repeat)
+    return {f"value_parser/{rows:,} rows": samples}
+
+
+# Figure construction without the figure cache, called as the dashboard does
+def bench_figures(repeat):
+    results = {}
+    for figure, (name, inputs) in FIGURES.items():
+        builder = getattr(nass_figures, figure)
+        df = load_dataset(name)
+        if inputs == 'frame':
+            args = (df,)
+        else:
+            latest_year, latest_rows = latest_year_rows(summarize_series(df, SERIES[name][0]))
+            args = (latest_rows, latest_year)
+        _, results[f"figure/{figure}"] = _timed(lambda: builder(*args), repeat)
+    return results
+
+
+# Full-script runs of streamlit_app.py per page: the first run after the
+# in-process caches are cleared (as after a server restart, with the Parquet
+# cache on disk) and warm reruns
+def bench_app(repeat):
+    import streamlit as st
+
+    logging.disable(logging.WARNING)  # AppTest's bare-mode "no runtime" notices
+    results = {}
+    for page in PAGES:
+        def run_page():
+            at = open_page(page).run()
+            if at.exception:
+                raise RuntimeError(f"{page}: {at.exception[0].message}")
+
+        first = []
+        for _ in range(repeat):
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            nass_figures.FIGURE_CACHE.clear()
+            first.extend(_timed(run_page, 1, warmup=0)[1])
+        results[f"app_first_run/{page}"] = first
+        _, results[f"app_rerun/{page}"] = _timed(run_page, repeat)
+    return results
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, check=True,
+                                capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(dirty)
+
+
+def summarize(samples):
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "max": max(samples),
+        "samples": samples,
+    }
+
+
+def run(data_dir, repeat, stages, parser_rows):
+    results = {}
+    os.chdir(data_dir)  # The dashboard reads its exports and cache relative to here
+    if 'parser' in stages:
+        results.update(bench_parser(repeat, parser_rows))
+    if 'data' in stages:
+        results.update(bench_datasets(repeat))
+    if 'figures' in stages:
+        results.update(bench_figures(repeat))
+    if 'app' in stages:
+        results.update(bench_app(repeat))
+    return {key: summarize(samples) for key, samples in results.items()}
+
+
+# Median ratios against a previous results file; returns the stages slower
+# than `threshold` (e.g. 0.2 = 20%)
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'stage':45} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for key, current in results.items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            print(f"{key:45} {'-':>10} {current['median'] * 1000:>8.1f}ms")
+            continue
+        ratio = current["median"] / previous["median"] if previous["median"] else float('inf')
+        flag = "  <- slower" if ratio > 1 + threshold else ""
+        print(f"{key:45} {previous['median'] * 1000:>8.1f}ms {current['median'] * 1000:>8.1f}ms "
+              f"{ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's stages.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default='small',
+                        help="synthetic data size (ignored with --data)")
+    parser.add_argument("--data", help="directory with exports to use instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stages", nargs="+", choices=['parser', 'data', 'figures', 'app'],
+                        default=['parser', 'data', 'figures', 'app'])
+    parser.add_argument("--parser-rows", type=int, default=10_000_000,
+                        help="values parsed by the value_parser stage")
+    parser.add_argument("--output", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="results JSON of a baseline run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    work_dir = None
+    if args.data:
+        data_dir = os.path.abspath(args.data)
+        rows = {}
+    else:
+        work_dir = data_dir = tempfile.mkdtemp(prefix="nass-bench-")
+        rows = {name: count for name, (_, count) in
+                generate(data_dir, SCALES[args.scale], args.seed).items()}
+
+    commit, dirty = _git_commit()
+    report = {
+        "schema": RESULTS_SCHEMA,
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "data": args.data,
+            "scale": None if args.data else dict(asdict(SCALES[args.scale]), name=args.scale),
+            "seed": args.seed,
+            "rows": rows,
+            "repeat": args.repeat,
+            "parser_rows": args.parser_rows,
+        },
+    }
+    try:
+        report["results"] = run(data_dir, args.repeat, args.stages, args.parser_rows)
+    finally:
+        os.chdir(REPO_ROOT)
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    elif not args.compare:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report["results"], baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
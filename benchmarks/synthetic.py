@@ -0,0 +1,203 @@
+import argparse
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from nass_data import DATASETS, MONTHS
+from quickstats import EXPORT_COLUMNS
+
+# QuickStats-shaped exports at any scale, with the same file names, columns,
+# quoting and row order (newest year first) as the bundled CSVs
+
+STATES = [
+    'INDIANA', 'KENTUCKY', 'OHIO', 'TENNESSEE', 'ALABAMA', 'ARIZONA', 'ARKANSAS',
+    'CALIFORNIA', 'COLORADO', 'CONNECTICUT', 'DELAWARE', 'FLORIDA', 'GEORGIA', 'IDAHO',
+    'ILLINOIS', 'IOWA', 'KANSAS', 'LOUISIANA', 'MAINE', 'MARYLAND', 'MASSACHUSETTS',
+    'MICHIGAN', 'MINNESOTA', 'MISSISSIPPI', 'MISSOURI', 'MONTANA', 'NEBRASKA', 'NEVADA',
+    'NEW HAMPSHIRE', 'NEW JERSEY', 'NEW MEXICO', 'NEW YORK', 'NORTH CAROLINA',
+    'NORTH DAKOTA', 'OKLAHOMA', 'OREGON', 'PENNSYLVANIA', 'RHODE ISLAND', 'SOUTH CAROLINA',
+    'SOUTH DAKOTA', 'TEXAS', 'UTAH', 'VERMONT', 'VIRGINIA', 'WASHINGTON', 'WEST VIRGINIA',
+    'WISCONSIN', 'WYOMING', 'ALASKA', 'HAWAII',
+]
+COMMODITIES = ['CORN', 'SOYBEANS', 'WHEAT', 'OATS', 'BARLEY', 'SORGHUM', 'RICE', 'RYE',
+               'FLAXSEED', 'SUNFLOWER']
+
+# Withheld-value codes QuickStats publishes instead of a number, most common first
+SUPPRESSION_CODES = ['(D)', '(Z)', '(NA)', '(X)', '(S)']
+SUPPRESSION_WEIGHTS = [0.6, 0.15, 0.1, 0.1, 0.05]
+
+
+# How big the generated exports are. Counties only add county-level rows to
+# the cropland export (the dashboard reads its state rows); periods add
+# sub-annual rows to the price and index exports.
+@dataclass(frozen=True)
+class Scale:
+    states: int = 4
+    commodities: int = 3
+    years: int = 30
+    last_year: int = 2025
+    periods: tuple = ('annual',)
+    counties: int = 0
+    suppression_rate: float = 0.02
+
+
+SCALES = {
+    'small': Scale(),
+    'medium': Scale(states=12, commodities=5, years=50, periods=('annual', 'monthly'),
+                    counties=25),
+    'large': Scale(states=50, commodities=10, years=50, periods=('annual', 'monthly', 'weekly'),
+                   counties=80),
+}
+
+
+def _series_values(rng, n_series, years, base, growth, noise):
+    # Geometric trend per series with yearly noise, one row per (series, year)
+    start = base * rng.uniform(0.6, 1.4, n_series)
+    rate = rng.normal(growth, growth / 2, n_series)
+    steps = np.arange(len(years))
+    trend = start[:, None] * (1 + rate[:, None]) ** steps[None, :]
+    return trend * rng.normal(1, noise, trend.shape)
+
+
+def _periods(scale, annual_label, years):
+    # (Year, Period, Week Ending) rows for every requested resolution
+    rows = [(year, annual_label, '') for year in years]
+    if 'monthly' in scale.periods:
+        rows += [(year, month, '') for year in years for month in MONTHS]
+    if 'weekly' in scale.periods:
+        for year in years:
+            for week, day in enumerate(pd.date_range(f"{year}-01-01", periods=52, freq='W-SUN'), 1):
+                rows.append((year, f"WEEK #{week:02d}", day.strftime('%Y-%m-%d')))
+    return pd.DataFrame(rows, columns=['Year', 'Period', 'Week Ending'])
+
+
+def _export_frame(rows, comma_values):
+    frame = pd.DataFrame({column: '' for column in EXPORT_COLUMNS}, index=rows.index)
+    frame['Program'] = 'SURVEY'
+    frame['watershed_code'] = '00000000'
+    frame['Domain'] = 'TOTAL'
+    frame['Domain Category'] = 'NOT SPECIFIED'
+    for column in rows.columns.drop('value'):
+        frame[column] = rows[column].fillna('').astype(str)
+
+    if comma_values:
+        frame['Value'] = [f"{value:,.0f}" for value in rows['value']]
+    else:
+        frame['Value'] = [f"{value:.2f}".rstrip('0').rstrip('.') for value in rows['value']]
+    return frame.sort_values(['Year'], ascending=False, kind='stable')
+
+
+def _cropland_rows(scale, rng, years):
+    states = STATES[:scale.states]
+    values = _series_values(rng, len(states), years, 1500, 0.04, 0.02)
+    rows = pd.DataFrame({
+        'Year': np.tile(years, len(states)),
+        'State': np.repeat(states, len(years)),
+        'State ANSI': np.repeat([f"{i + 1:02d}" for i in range(len(states))], len(years)),
+        'value': values.ravel(),
+    })
+    rows['Geo Level'] = 'STATE'
+    rows['Period'] = 'YEAR'
+    rows['suppressible'] = False
+
+    if scale.counties:
+        counties = rows.loc[rows.index.repeat(scale.counties)].reset_index(drop=True)
+        county = np.tile(np.arange(1, scale.counties + 1), len(rows))
+        counties['Geo Level'] = 'COUNTY'
+        counties['County'] = [f"COUNTY {i:03d}" for i in county]
+        counties['County ANSI'] = [f"{i:03d}" for i in county]
+        counties['value'] *= rng.normal(1, 0.15, len(counties))
+        counties['suppressible'] = True
+        rows = pd.concat([rows, counties], ignore_index=True)
+
+    rows['Commodity'] = 'AG LAND'
+    rows['Data Item'] = 'AG LAND, CROPLAND - ASSET VALUE, MEASURED IN $ / ACRE'
+    return rows
+
+
+# National (and, beyond the bundled layout, state) price rows per commodity
+def _price_rows(scale, rng, years):
+    commodities = COMMODITIES[:scale.commodities]
+    periods = _periods(scale, 'MARKETING YEAR', years)
+    geos = [('NATIONAL', 'US TOTAL')] + [('STATE', state) for state in STATES[:scale.states]]
+    frames = []
+    for commodity in commodities:
+        values = _series_values(rng, len(geos), years, 6, 0.02, 0.12)
+        year_index = periods['Year'].to_numpy() - years[0]
+        for (level, state), series in zip(geos, values):
+            frame = periods.copy()
+            frame['value'] = series[year_index] * rng.normal(1, 0.04, len(frame))
+            frame['Geo Level'] = level
+            frame['State'] = state
+            frame['Commodity'] = commodity
+            frame['Data Item'] = f"{commodity} - PRICE RECEIVED, MEASURED IN $ / BU"
+            frames.append(frame)
+    rows = pd.concat(frames, ignore_index=True)
+    rows['suppressible'] = rows['Geo Level'] != 'NATIONAL'
+    return rows
+
+
+def _index_rows(scale, rng, years):
+    periods = _periods(scale, 'YEAR', years)
+    values = _series_values(rng, 1, years, 60, 0.025, 0.05)[0]
+    rows = periods.copy()
+    rows['value'] = values[rows['Year'].to_numpy() - years[0]] * rng.normal(1, 0.02, len(rows))
+    rows['Geo Level'] = 'NATIONAL'
+    rows['State'] = 'US TOTAL'
+    rows['Commodity'] = 'FOOD COMMODITIES'
+    rows['Data Item'] = 'FOOD COMMODITIES - INDEX FOR PRICE RECEIVED, 2011'
+    rows['suppressible'] = False
+    return rows
+
+
+GENERATORS = {
+    'cropland': (_cropland_rows, True),
+    'crop_prices': (_price_rows, False),
+    'index_pricing': (_index_rows, False),
+}
+
+
+# Write one synthetic export per dataset into out_dir under the file names the
+# dashboard loads, returning {dataset: (path, rows)}. Suppression codes only
+# replace sub-national values, where QuickStats withholds them; those rows
+# also carry a CV (%), withheld along with the value.
+def generate(out_dir, scale=SCALES['small'], seed=0):
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    years = np.arange(scale.last_year - scale.years + 1, scale.last_year + 1)
+    written = {}
+    for name, (make_rows, comma_values) in GENERATORS.items():
+        rows = make_rows(scale, rng, years)
+        rate = np.where(rows.pop('suppressible'), scale.suppression_rate, 0.0)
+        frame = _export_frame(rows, comma_values)
+        suppressed = rng.random(len(frame)) < rate[frame.index]
+        frame.loc[suppressed, 'Value'] = rng.choice(SUPPRESSION_CODES, suppressed.sum(),
+                                                    p=SUPPRESSION_WEIGHTS)
+        cv = np.char.mod('%.1f', rng.gamma(2.0, 3.0, len(frame)))
+        frame['CV (%)'] = np.where(rate[frame.index] > 0, cv, '')
+        frame.loc[suppressed, 'CV (%)'] = frame.loc[suppressed, 'Value']
+
+        path = os.path.join(out_dir, DATASETS[name].path)
+        table = pa.Table.from_pandas(frame[list(EXPORT_COLUMNS)], preserve_index=False)
+        pa_csv.write_csv(table, path, pa_csv.WriteOptions(quoting_style="all_valid"))
+        written[name] = (path, len(frame))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate QuickStats-shaped test exports.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--scale", choices=sorted(SCALES), default='small')
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for name, (path, rows) in generate(args.out_dir, SCALES[args.scale], args.seed).items():
+        print(f"{name}: {rows:,} rows, {os.path.getsize(path) / 2**20:.1f} MB -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from nass_data import DATASETS
+from quickstats import EXPORT_COLUMNS, ROW_LIMIT
+
+# Local stand-in for the QuickStats API, answering `get_counts` and `api_GET`
+# from export CSVs so the ingestion client can run offline. Only the JSON
+# format and equality / year comparison filters are supported.
+
+COMPARISONS = {
+    '__GE': lambda column, value: column >= value,
+    '__LE': lambda column, value: column <= value,
+    '__GT': lambda column, value: column > value,
+    '__LT': lambda column, value: column < value,
+    '__NE': lambda column, value: column != value,
+}
+
+
+# Export CSVs in API field names. Statistic and unit aren't export columns,
+# so they are recovered from the data item ("CORN - PRICE RECEIVED, MEASURED IN $ / BU").
+def load_rows(paths):
+    frames = [pd.read_csv(path, dtype=str, keep_default_na=False) for path in paths]
+    rows = pd.concat(frames, ignore_index=True).rename(columns=EXPORT_COLUMNS)
+    item = rows['short_desc'].str.extract(r' - ([^,]+)(?:, MEASURED IN (.+))?$')
+    rows['statisticcat_desc'] = item[0].fillna('')
+    rows['unit_desc'] = item[1].fillna('')
+    rows['year'] = rows['year'].astype(int)
+    return rows
+
+
+def select_rows(rows, params):
+    mask = pd.Series(True, index=rows.index)
+    for name, values in params.items():
+        if name in ('key', 'format'):
+            continue
+        field, compare = name, None
+        for suffix, operator in COMPARISONS.items():
+            if name.endswith(suffix):
+                field, compare = name[:-len(suffix)], operator
+        if field not in rows.columns:
+            raise KeyError(field)
+        column = rows[field]
+        if compare is not None:
+            value = int(values[0]) if field == 'year' else values[0]
+            mask &= compare(column, value)
+        else:
+            # Repeated parameters are alternatives, as in the real API
+            mask &= column.astype(str).isin(values)
+    return rows[mask]
+
+
+class QuickStatsHandler(BaseHTTPRequestHandler):
+    # Set on the server: rows, row_limit, fail_rate, latency, stats
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        endpoint = url.path.strip('/').rsplit('/', 1)[-1]
+        with server.lock:
+            server.stats[endpoint] = server.stats.get(endpoint, 0) + 1
+
+        if server.latency:
+            time.sleep(server.latency)
+        if random.random() < server.fail_rate:
+            return self._reply(503, {"error": ["service unavailable"]}, retry_after=0)
+        if endpoint not in ('get_counts', 'api_GET'):
+            return self._reply(404, {"error": [f"unknown endpoint {endpoint}"]})
+
+        try:
+            selected = select_rows(server.rows, parse_qs(url.query))
+        except KeyError as exc:
+            return self._reply(400, {"error": [f"bad request - invalid field {exc.args[0]}"]})
+
+        if endpoint == 'get_counts':
+            return self._reply(200, {"count": len(selected)})
+        if len(selected) > server.row_limit:
+            return self._reply(413, {"error": [f"exceeds limit={server.row_limit}"]})
+        if selected.empty:
+            return self._reply(400, {"error": ["bad request - no data"]})
+        return self._reply(200, {"data": selected.to_dict(orient='records')})
+
+    def _reply(self, status, payload, retry_after=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+
+def make_server(paths=None, host="127.0.0.1", port=0, row_limit=ROW_LIMIT, fail_rate=0.0,
+                latency=0.0):
+    server = ThreadingHTTPServer((host, port), QuickStatsHandler)
+    server.daemon_threads = True
+    server.rows = load_rows(paths or [spec.path for spec in DATASETS.values()])
+    server.row_limit = row_limit
+    server.fail_rate = fail_rate
+    server.latency = latency
+    server.stats = {}
+    server.lock = threading.Lock()
+    return server
+
+
+# Run a stand-in server in a background thread for the duration of the block
+# and yield its API base URL, e.g.
+#     with mock_server(row_limit=50) as url:
+#         QuickStatsClient(base_url=url) ...
+@contextmanager
+def mock_server(paths=None, **options):
+    server = make_server(paths, **options)
+    thread = threading.Thread(target=server.serve_forever, name="mock-quickstats", daemon=True)
+    thread.start()
+    try:
+        yield f"http://{server.server_address[0]}:{server.server_address[1]}/api"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the bundled exports as a QuickStats API.")
+    parser.add_argument("paths", nargs="*", help="export CSVs to serve (default: the bundled ones)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--row-limit", type=int, default=ROW_LIMIT)
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 503")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each reply")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.paths, port=args.port, row_limit=args.row_limit,
+                         fail_rate=args.fail_rate, latency=args.latency)
+    print(f"Mock QuickStats API on http://127.0.0.1:{args.port}/api")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from nass_data import content_version, frame_version
+
+# Cross-dataset analytics. Every series of the loaded datasets is aligned
+# once on a shared year axis as a dense year x series matrix with an
+# observation mask; derived series (deflated prices, ratios between datasets)
+# are then plain array operations on column blocks of that matrix. Marketing
+# years are aligned with the calendar year they start in.
+
+# The Food Commodities Price Index is published with 2011 = 100
+INDEX_BASE_YEAR = 2011
+INDEX_BASE = 100.0
+
+
+# Year x series values on a shared axis: `values` is NaN wherever `mask` is
+# False. `version` identifies the content, e.g. for the figure cache.
+@dataclass(frozen=True, eq=False)
+class SeriesBlock:
+    years: np.ndarray
+    names: tuple
+    values: np.ndarray
+    mask: np.ndarray
+    version: str
+
+    def column(self, name):
+        return self.names.index(name)
+
+    # The same series restricted to the points where `mask` is also True, e.g.
+    # to compare two blocks over the years both are observed
+    def where(self, mask):
+        mask = self.mask & mask
+        return SeriesBlock(self.years, self.names, np.where(mask, self.values, np.nan), mask,
+                           content_version('where', self.version, mask.tobytes()))
+
+    # First and last observation of every series as a frame indexed by name
+    # (earliest_year, earliest_value, latest_year, latest_value, change_pct);
+    # series never observed are left out
+    def endpoints(self):
+        if not len(self.years):
+            return pd.DataFrame(columns=['earliest_year', 'earliest_value', 'latest_year',
+                                         'latest_value', 'change_pct'])
+        observed = self.mask.any(axis=0)
+        columns = np.arange(len(self.names))
+        first = np.argmax(self.mask, axis=0)
+        last = len(self.years) - 1 - np.argmax(self.mask[::-1], axis=0)
+        table = pd.DataFrame({
+            'earliest_year': self.years[first],
+            'earliest_value': self.values[first, columns],
+            'latest_year': self.years[last],
+            'latest_value': self.values[last, columns],
+        }, index=list(self.names))[observed]
+        table['change_pct'] = (table['latest_value'] / table['earliest_value'] - 1) * 100
+        return table
+
+
+# All series of several datasets on one year axis, each dataset a contiguous
+# block of columns so selecting one is a view, not a copy
+@dataclass(frozen=True, eq=False)
+class Panel:
+    years: np.ndarray
+    blocks: dict  # dataset -> (first column, end column, series names)
+    values: np.ndarray
+    mask: np.ndarray
+    version: str
+
+    def block(self, dataset, names=None):
+        start, end, block_names = self.blocks[dataset]
+        if names is None:
+            columns, names = slice(start, end), block_names
+        else:
+            columns = [start + block_names.index(name) for name in names]
+        return SeriesBlock(self.years, tuple(names), self.values[:, columns],
+                           self.mask[:, columns], content_version(self.version, dataset, names))
+
+
+# Values of `series_col` that cover several data items. A selection from a
+# series index records those of the whole frame in its attrs, so a series
+# keeps its label however few of its neighbours are selected.
+def shared_series(df, series_col):
+    if 'shared_series' in df.attrs:
+        return df.attrs['shared_series'].get(series_col, ())
+    if 'Data Item' not in df.columns:
+        return ()
+    pairs = pd.DataFrame({'series': df[series_col], 'item': df['Data Item']}).drop_duplicates()
+    return tuple(pairs['series'][pairs['series'].duplicated()].unique())
+
+
+# Series name of every row: its value in the series column, or its data item
+# where that value covers several data items (say, two index series for one
+# commodity), so each published series stays a series of its own
+def series_labels(df, series_col):
+    labels = df[series_col]
+    shared = shared_series(df, series_col)
+    if not len(shared):
+        return labels
+    return labels.astype(str).mask(labels.isin(shared), df['Data Item'].astype(str))
+
+
+# Align `frames` ({dataset: (frame, series column)}) on the union of their
+# years. Each dataset's series (see series_labels) are sorted by name; a
+# (series, year) with several rows keeps the first.
+def align(frames):
+    observed = {}
+    for name, (df, series_col) in frames.items():
+        rows = df.loc[df['Value_Clean'].notna(), ['Year', 'Value_Clean']]
+        rows.insert(0, series_col, series_labels(df, series_col).loc[rows.index])
+        observed[name] = rows
+    years = np.unique(np.concatenate(
+        [np.array([], dtype=int)] + [rows['Year'].to_numpy(dtype=int) for rows in observed.values()]
+    ))
+
+    blocks, columns = {}, []
+    start = 0
+    for name, rows in observed.items():
+        rows = rows.drop_duplicates([frames[name][1], 'Year'])
+        codes, names = pd.factorize(rows[frames[name][1]].astype(str), sort=True)
+        block = np.full((len(years), len(names)), np.nan)
+        year_rows = np.searchsorted(years, rows['Year'].to_numpy(dtype=int))
+        block[year_rows, codes] = rows['Value_Clean'].to_numpy(dtype=float)
+        blocks[name] = (start, start + len(names), tuple(names))
+        columns.append(block)
+        start += len(names)
+
+    values = np.hstack(columns) if columns else np.empty((len(years), 0))
+    version = content_version(*(frame_version(df) for df, _ in frames.values()), tuple(frames))
+    return Panel(years, blocks, values, ~np.isnan(values), version)
+
+
+# scale * numerators / denominators where both are observed. The arrays may
+# be any shapes that broadcast together.
+def _divide(numerators, numerator_mask, denominators, denominator_mask, scale=1.0):
+    mask = numerator_mask & denominator_mask
+    values = np.divide(numerators * scale, denominators, out=np.full(mask.shape, np.nan),
+                       where=mask)
+    mask &= np.isfinite(values)
+    return np.where(mask, values, np.nan), mask
+
+
+def _check_axis(*blocks):
+    if any(not np.array_equal(blocks[0].years, block.years) for block in blocks[1:]):
+        raise ValueError("series blocks are not on the same year axis")
+
+
+# Prices in base-year terms: nominal / index * 100, for every price series at
+# once against a single index series
+def deflate(prices, index, base=INDEX_BASE):
+    _check_axis(prices, index)
+    if len(index.names) != 1:
+        raise ValueError("deflate needs exactly one index series")
+    values, mask = _divide(prices.values, prices.mask, index.values, index.mask, base)
+    return SeriesBlock(prices.years, prices.names, values, mask,
+                       content_version('deflate', prices.version, index.version, base))
+
+
+# Every numerator series divided by every denominator series, named
+# "NUMERATOR / DENOMINATOR" in numerator-major order; with pairwise=True the
+# i-th numerator is divided by the i-th denominator only
+def ratio(numerators, denominators, pairwise=False):
+    _check_axis(numerators, denominators)
+    if pairwise:
+        pairs = list(zip(numerators.names, denominators.names))
+        n = len(pairs)
+        values, mask = _divide(numerators.values[:, :n], numerators.mask[:, :n],
+                               denominators.values[:, :n], denominators.mask[:, :n])
+    else:
+        pairs = [(a, b) for a in numerators.names for b in denominators.names]
+        values, mask = _divide(numerators.values[:, :, None], numerators.mask[:, :, None],
+                               denominators.values[:, None, :], denominators.mask[:, None, :])
+        values, mask = values.reshape(len(values), -1), mask.reshape(len(mask), -1)
+    return SeriesBlock(numerators.years, tuple(f"{a} / {b}" for a, b in pairs), values, mask,
+                       content_version('ratio', numerators.version, denominators.version, pairwise))
@@ -0,0 +1,593 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Typed Parquet copies of the QuickStats CSV exports are kept here so that
+# later server starts can skip the CSV parse entirely
+CACHE_DIR = os.environ.get("NASS_CACHE_DIR", ".cache")
+
+# Bump whenever the cached frame layout or the value cleaning changes
+CACHE_VERSION = 6
+
+# QuickStats columns the dashboard reads. The rest of the 21-column export is
+# empty or constant for our pulls and is never parsed.
+BASE_COLUMNS = ('Year', 'Period', 'State', 'Commodity', 'Data Item', 'Value', 'CV (%)')
+
+# What identifies one series: geography, commodity, data item and period.
+# Cached frames are sorted by these and then Year, so each series is one
+# contiguous, year-sorted run of rows.
+SERIES_INDEX_KEYS = ('State', 'Commodity', 'Data Item', 'Period')
+
+# One chart point per (series, year); streaming ingest reduces to these keys
+SERIES_KEYS = SERIES_INDEX_KEYS + ('Year',)
+
+# Streaming ingest reads the export in blocks of this many bytes and is used
+# automatically for files larger than the threshold
+DEFAULT_CHUNK_BYTES = 64 << 20
+STREAMING_THRESHOLD_BYTES = 256 << 20
+
+
+# Time resolutions the charts can be drawn at, and the QuickStats `Period`
+# labels that belong to each sub-annual resolution
+RESOLUTIONS = ('annual', 'monthly', 'weekly')
+MONTHS = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
+
+
+# Predicate matching column values by prefix, e.g. weekly periods "WEEK #01"
+@dataclass(frozen=True)
+class PrefixMatch:
+    prefix: str
+
+    def mask(self, array):
+        return pc.starts_with(array, pattern=self.prefix)
+
+
+PERIOD_FILTERS = {
+    'monthly': MONTHS,
+    'weekly': PrefixMatch("WEEK #"),
+}
+
+
+# Codes QuickStats publishes in place of a value (or CV) it withholds
+SUPPRESSION_CODES = {
+    '(D)': "Withheld to avoid disclosing data for individual operations",
+    '(Z)': "Less than half the rounding unit",
+    '(NA)': "Not available",
+    '(X)': "Not applicable",
+    '(S)': "Insufficient number of reports to publish an estimate",
+    '(H)': "Coefficient of variation of 99.95% or more",
+    '(L)': "Coefficient of variation below 0.05%",
+}
+_SUPPRESSION_SET = pa.array(list(SUPPRESSION_CODES))
+
+# Plain or thousands-separated decimals once the commas are removed
+_NUMBER_PATTERN = r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$'
+
+
+# Parse a column of published values ("8,250", "4.35", "(D)") in one
+# vectorized pass. Returns the values as floats (NaN where none was
+# published) and the index of each suppression code in SUPPRESSION_CODES
+# (-1 for published values and for anything unrecognised).
+def parse_values(values):
+    if not isinstance(values, (pa.Array, pa.ChunkedArray)):
+        values = pa.array(values, type=pa.string(), from_pandas=True)
+    elif values.type != pa.string():
+        values = values.cast(pa.string())  # e.g. an all-empty column read as nulls
+    text = pc.utf8_trim_whitespace(values)
+    codes = pc.index_in(text, value_set=_SUPPRESSION_SET)
+    digits = pc.if_else(pc.is_null(codes), pc.replace_substring(text, ',', ''), None)
+    try:
+        numbers = pc.cast(digits, pa.float64())
+    except pa.ArrowInvalid:
+        # Stray text (footnotes, blanks): only cast what looks like a number
+        numbers = pc.cast(pc.if_else(pc.match_substring_regex(digits, _NUMBER_PATTERN),
+                                     digits, None), pa.float64())
+    return (numbers.to_numpy(zero_copy_only=False),
+            pc.fill_null(codes, -1).cast(pa.int8()).to_numpy(zero_copy_only=False))
+
+
+def suppression_categories(codes):
+    return pd.Categorical.from_codes(codes, categories=list(SUPPRESSION_CODES))
+
+
+# Frame of an Arrow table or batch of export rows with the published values
+# parsed: `Value_Clean` (float), `Suppressed` (the code withholding the
+# value, else NaN) and `CV` (the coefficient of variation in percent) in
+# place of the raw `CV (%)` text. The raw `Value` text is kept for display.
+def to_clean_frame(table):
+    values, codes = parse_values(table.column('Value'))
+    cv = parse_values(table.column('CV (%)'))[0] if 'CV (%)' in table.column_names else None
+    df = table.to_pandas()
+    df['Value_Clean'] = values
+    df['Suppressed'] = suppression_categories(codes)
+    df['CV'] = np.full(len(df), np.nan, dtype='float32') if cv is None else cv.astype('float32')
+    return df.drop(columns=['CV (%)'], errors='ignore')
+
+
+# Everything the loader needs to know about one QuickStats export.
+# `where` holds (column, allowed values) pairs that are applied while parsing;
+# predicate columns don't need to be listed in `columns`.
+@dataclass(frozen=True)
+class DatasetSpec:
+    path: str
+    columns: tuple = BASE_COLUMNS
+    where: tuple = ()
+
+    # Identifies the cached layout, so editing a spec invalidates its cache
+    def signature(self):
+        return {
+            "columns": list(self.columns),
+            "where": [
+                [column, list(values) if isinstance(values, tuple) else repr(values)]
+                for column, values in self.where
+            ],
+        }
+
+    # The same export restricted to monthly or weekly rows instead of the
+    # spec's own (annual) period filter
+    def at_resolution(self, resolution):
+        if resolution == 'annual':
+            return self
+        where = tuple((column, values) for column, values in self.where if column != 'Period')
+        columns = self.columns + (('Week Ending',) if resolution == 'weekly' else ())
+        return replace(self, columns=columns, where=where + (('Period', PERIOD_FILTERS[resolution]),))
+
+
+DATASETS = {
+    'cropland': DatasetSpec("Cropland Value.csv", where=(('Geo Level', ('STATE',)),)),
+    # Annual prices are reported per marketing year
+    'crop_prices': DatasetSpec(
+        "Crop Prices.csv",
+        where=(('Geo Level', ('NATIONAL',)), ('Period', ('MARKETING YEAR',))),
+    ),
+    # Only the annual price received rows are charted
+    'index_pricing': DatasetSpec(
+        "Index Pricing.csv",
+        where=(('Geo Level', ('NATIONAL',)), ('Period', ('YEAR',))),
+    ),
+}
+
+
+# Large exports (e.g. full county-level dumps) are streamed by default
+def prefers_streaming(name):
+    return os.path.getsize(DATASETS[name].path) > STREAMING_THRESHOLD_BYTES
+
+
+# Hash the source file in fixed-size blocks so large exports never sit in memory
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Hash of `length` bytes of a file starting at `start`, after hashing `prefix`
+def range_sha256(path, start, length, prefix=b"", block_size=1 << 20):
+    digest = hashlib.sha256(prefix)
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(block_size, length))
+            if not block:
+                break
+            digest.update(block)
+            length -= len(block)
+    return digest.hexdigest()
+
+
+def _header_bytes(path):
+    with open(path, "rb") as f:
+        return len(f.readline())
+
+
+# Cheap change stamp for a dataset's source file; passing it into cached
+# loaders makes every rerun notice a replaced export
+def source_stamp(name):
+    stat = os.stat(DATASETS[name].path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def cache_paths(name):
+    base = os.path.join(CACHE_DIR, name)
+    return base + ".parquet", base + ".json"
+
+
+# Combined boolean mask for (column, allowed values) predicates
+def _row_mask(batch, where):
+    mask = None
+    for column, values in where:
+        if isinstance(values, PrefixMatch):
+            matches = values.mask(batch.column(column))
+        else:
+            matches = pc.is_in(batch.column(column), value_set=pa.array(values))
+        mask = matches if mask is None else pc.and_(mask, matches)
+    return mask
+
+
+# Stream the CSV block by block, parsing only the projected and predicate
+# columns and dropping rows that fail the predicates before they are kept
+def _filtered_batches(spec, source, where, block_size=None):
+    columns = list(spec.columns)
+    read_columns = columns + [c for c, _ in where if c not in columns]
+    column_types = {column: pa.string() for column in read_columns}
+    column_types['Year'] = pa.int16()
+
+    read_options = pa_csv.ReadOptions()
+    if block_size:
+        read_options.block_size = block_size
+    reader = pa_csv.open_csv(
+        source,
+        read_options=read_options,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=read_columns,
+            column_types=column_types,
+            strings_can_be_null=True,
+            include_missing_columns=True,  # Older exports have no CV (%) column
+        ),
+    )
+
+    for batch in reader:
+        if where:
+            batch = batch.filter(_row_mask(batch, where))
+        yield batch.select(columns)
+
+
+def _filtered_table(spec, where):
+    where = spec.where + tuple(where)
+    batches = list(_filtered_batches(spec, spec.path, where))
+    if batches:
+        return pa.Table.from_batches(batches)
+    return pa.table({column: pa.array([], pa.string()) for column in spec.columns})
+
+
+# The export's projected, filtered rows as raw strings (Year aside)
+def read_filtered_table(spec, where=()):
+    return _filtered_table(spec, where).to_pandas()
+
+
+def read_filtered_csv(spec, where=()):
+    return to_clean_frame(_filtered_table(spec, where))
+
+
+# How running per-series totals combine across blocks
+SERIES_TOTALS = {'sum': 'sum', 'count': 'sum', 'rows': 'sum', 'code': 'max', 'cv': 'sum',
+                 'cv_count': 'sum'}
+
+
+# Per-series totals of one block: value sum and count, rows, the highest
+# suppression code seen and the CV sum and count
+def _series_totals(chunk, keys):
+    chunk['code'] = chunk['Suppressed'].cat.codes
+    return chunk.groupby(keys, dropna=False, observed=True).agg(
+        sum=('Value_Clean', 'sum'), count=('Value_Clean', 'count'), rows=('Value_Clean', 'size'),
+        code=('code', 'max'), cv=('CV', 'sum'), cv_count=('CV', 'count'),
+    )
+
+
+# Out-of-core ingest: each block is filtered, parsed and folded into running
+# per-series totals, so peak memory follows the number of (series, year)
+# points rather than the size of the export. Series with more than one
+# matching row (e.g. several counties) are averaged and lose their CV; a point
+# with no published value at all keeps the code that withheld it.
+def stream_series(spec, where=(), chunk_bytes=DEFAULT_CHUNK_BYTES, progress=None):
+    where = spec.where + tuple(where)
+    keys = list(SERIES_KEYS) + [column for column in ('Week Ending',) if column in spec.columns]
+    columns = keys + ['Value', 'Value_Clean', 'Suppressed', 'CV']
+    total_bytes = max(os.path.getsize(spec.path), 1)
+
+    totals = None
+    with open(spec.path, "rb") as f:
+        for batch in _filtered_batches(spec, f, where, block_size=chunk_bytes):
+            partial = _series_totals(to_clean_frame(batch), keys)
+            if totals is not None:
+                partial = pd.concat([totals, partial]).groupby(
+                    level=keys, dropna=False, sort=False
+                ).agg(SERIES_TOTALS)
+            totals = partial
+            if progress is not None:
+                progress(min(f.tell() / total_bytes, 1.0))
+
+    if totals is None:
+        return pd.DataFrame(columns=columns)
+
+    series = totals.reset_index()
+    published = series['count'] > 0
+    series['Value_Clean'] = series['sum'] / series['count'].where(published)
+    series['Suppressed'] = suppression_categories(
+        np.where(published, -1, series['code']).astype('int8')
+    )
+    series['CV'] = series['cv'].where((series['rows'] == 1) & (series['cv_count'] == 1))
+    series['CV'] = series['CV'].astype('float32')
+    series['Value'] = series['Value_Clean'].map(_format_value, na_action='ignore')
+    series['Value'] = series['Value'].fillna(series['Suppressed'].astype(object))
+    return series[columns].sort_values(keys, ignore_index=True)
+
+
+# "8,250" / "4.35" style display strings for aggregated values
+def _format_value(value):
+    return f"{value:,.2f}".rstrip('0').rstrip('.')
+
+
+# Chart time axis for sub-annual rows: the first of the month for monthly
+# periods and the `Week Ending` date for weekly ones
+def add_time_axis(df, resolution):
+    if resolution == 'monthly':
+        month = df['Period'].astype(str).map({m: i for i, m in enumerate(MONTHS, start=1)})
+        df['Date'] = pd.to_datetime(
+            pd.DataFrame({'year': df['Year'], 'month': month, 'day': 1}), errors='coerce'
+        )
+    elif resolution == 'weekly':
+        df['Date'] = pd.to_datetime(df['Week Ending'], errors='coerce')
+    return df
+
+
+# Row order that groups the rows of each series together, oldest year first:
+# by the series key columns (category codes; categories are stored sorted),
+# then Year. Stable, so rows sharing a series and year keep their order.
+def series_order(df):
+    keys = [df[column].cat.codes.to_numpy() for column in SERIES_INDEX_KEYS
+            if column in df.columns]
+    return np.lexsort([df['Year'].to_numpy()] + keys[::-1])
+
+
+# Compact, typed columns for the cached frame: every text column becomes a
+# categorical, and optional export columns that are empty throughout (e.g.
+# `Week Ending` in a weekly view without weekly rows) are dropped. Rows are
+# put in series order.
+def to_typed_frame(df):
+    empty = [
+        column for column in df.columns
+        if column not in BASE_COLUMNS and df[column].dtype == object
+        and not df[column].fillna('').astype(str).str.len().any()
+    ]
+    df = df.drop(columns=empty)
+    df['Year'] = df['Year'].astype('int16')
+    df['Value_Clean'] = df['Value_Clean'].astype('float64')
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].astype('category')
+    return df.take(series_order(df)).reset_index(drop=True)
+
+
+# Read a cached frame column by column, without consolidating: numeric columns
+# and category codes stay zero-copy views of the read-only Arrow buffers, so
+# one frame can be shared by every session but not modified in place
+def read_shared_frame(path):
+    table = pq.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+# Bytes held by a frame, including the contents of text columns
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _read_source_info(info_path):
+    try:
+        with open(info_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Write through a temporary file renamed into place, so readers never see a
+# half-written file
+def write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)  # The write failed part-way
+
+
+def _write_source_info(info_path, info):
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(info, f)
+
+    write_atomic(info_path, write)
+
+
+# Source info of a cache file built by this code for this spec and mode,
+# whether or not the CSV has changed since
+def _compatible_source_info(spec, parquet_path, info_path, mode):
+    info = _read_source_info(info_path)
+    if info is None or info.get("cache_version") != CACHE_VERSION:
+        return None
+    if info.get("spec") != spec.signature() or info.get("mode") != mode:
+        return None
+    if not os.path.exists(parquet_path):
+        return None
+    return info
+
+
+# Check the cached copy against the CSV: an unchanged mtime and size is
+# trusted as-is, otherwise the content hash decides whether a rebuild is needed.
+# Returns the cache's source info when it is fresh, otherwise None.
+def _fresh_source_info(spec, parquet_path, info_path, mode):
+    csv_path = spec.path
+    info = _compatible_source_info(spec, parquet_path, info_path, mode)
+    if info is None:
+        return None
+
+    stat = os.stat(csv_path)
+    if info["mtime_ns"] == stat.st_mtime_ns and info["size"] == stat.st_size:
+        return info
+    if info["size"] != stat.st_size or info["sha256"] != file_sha256(csv_path):
+        return None
+
+    # Only the mtime moved (e.g. a fresh checkout), so remember the new one
+    info["mtime_ns"] = stat.st_mtime_ns
+    _write_source_info(info_path, info)
+    return info
+
+
+# Content version of a loaded frame: source hash plus everything that shapes
+# the parsed result. Stored in `df.attrs['version']` for downstream caches.
+def data_version(info):
+    key = json.dumps(
+        [info["cache_version"], info["sha256"], info["spec"], info["mode"]], sort_keys=True
+    )
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+# Short content version of anything derived from versioned data, hashed from
+# the versions and parameters it was derived with
+def content_version(*parts):
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+
+
+# Frames loaded here carry their content version; anything else is hashed
+def frame_version(df):
+    version = df.attrs.get('version')
+    if version is None:
+        version = format(int(pd.util.hash_pandas_object(df).sum()) & (2**64 - 1), 'x')
+    return version
+
+
+def _source_info(spec, mode):
+    stat = os.stat(spec.path)
+    return {
+        "cache_version": CACHE_VERSION,
+        "source": os.path.basename(spec.path),
+        "spec": spec.signature(),
+        "mode": mode,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "header_bytes": _header_bytes(spec.path),
+        "sha256": file_sha256(spec.path),
+    }
+
+
+# Write the cache and hand back the frame as read from it, so freshly built
+# and cached datasets share the same compact, read-only layout
+def _write_cache(df, info, parquet_path, info_path):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    write_atomic(parquet_path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+    _write_source_info(info_path, info)
+    df = read_shared_frame(parquet_path)
+    df.attrs['version'] = data_version(info)
+    return df
+
+
+def _build_cache(spec, read, parquet_path, info_path, mode):
+    info = _source_info(spec, mode)
+    return _write_cache(to_typed_frame(read()), info, parquet_path, info_path)
+
+
+# Locate the rows a new export added around the previously cached one.
+# QuickStats exports list the newest rows first, so new rows are usually
+# inserted right after the header; appends at the end are handled as well.
+# Returns the byte range (start, end) of the new rows, or None if the old
+# file is not contained unchanged in the new one.
+def _added_byte_range(path, previous, size):
+    old_size, header = previous["size"], previous["header_bytes"]
+    if size <= old_size or header != _header_bytes(path):
+        return None
+
+    def ends_line(offset):
+        with open(path, "rb") as f:
+            f.seek(offset - 1)
+            return f.read(1) == b"\n"
+
+    if range_sha256(path, 0, old_size) == previous["sha256"] and ends_line(old_size):
+        return old_size, size
+
+    with open(path, "rb") as f:
+        header_line = f.read(header)
+    body = old_size - header
+    if (range_sha256(path, size - body, body, prefix=header_line) == previous["sha256"]
+            and ends_line(size - body)):
+        return header, size - body
+    return None
+
+
+# Incremental refresh: when the new export only adds rows that are at least as
+# new as everything cached (by Date for sub-annual data, else Year), parse just
+# those rows and merge them into the cached frame instead of re-reading it all
+def _merge_added_rows(spec, resolution, parquet_path, info_path, previous):
+    added = _added_byte_range(spec.path, previous, os.path.getsize(spec.path))
+    if added is None:
+        return None
+
+    with open(spec.path, "rb") as f:
+        header_line = f.read(previous["header_bytes"])
+        f.seek(added[0])
+        new_rows = f.read(added[1] - added[0])
+    source = io.BytesIO(header_line + new_rows)
+    batches = list(_filtered_batches(spec, source, spec.where))
+
+    cached = read_shared_frame(parquet_path)
+    if not batches or sum(batch.num_rows for batch in batches) == 0:
+        df = cached
+    else:
+        new = add_time_axis(to_clean_frame(pa.Table.from_batches(batches)), resolution)
+        order_col = 'Date' if 'Date' in cached.columns else 'Year'
+        if len(cached) and new[order_col].min() < cached[order_col].max():
+            return None  # Revised or back-filled rows need a full reload
+        df = to_typed_frame(pd.concat([cached, new], ignore_index=True))
+
+    return _write_cache(df, _source_info(spec, previous["mode"]), parquet_path, info_path)
+
+
+# Load a registered dataset through the Parquet cache. In streaming mode the
+# export is reduced to one row per (series, period) while it is read, and
+# `progress` is called with the fraction of the file consumed so far.
+# Monthly and weekly resolutions also get a `Date` column for the time axis.
+def _dataset_cache(name, streaming, resolution):
+    spec = DATASETS[name].at_resolution(resolution)
+    mode = "stream" if streaming else "full"
+    cache_name = ".".join(part for part in (name, resolution, mode)
+                          if part not in ('annual', 'full'))
+    return (spec, mode) + cache_paths(cache_name)
+
+
+# Whether load_dataset can serve the dataset from a fresh Parquet copy
+# without parsing the export
+def is_cached(name, streaming=False, resolution='annual'):
+    spec, mode, parquet_path, info_path = _dataset_cache(name, streaming, resolution)
+    return _fresh_source_info(spec, parquet_path, info_path, mode) is not None
+
+
+def load_dataset(name, streaming=False, chunk_bytes=DEFAULT_CHUNK_BYTES, progress=None,
+                 resolution='annual'):
+    spec, mode, parquet_path, info_path = _dataset_cache(name, streaming, resolution)
+
+    info = _fresh_source_info(spec, parquet_path, info_path, mode)
+    if info is not None:
+        try:
+            df = read_shared_frame(parquet_path)
+            df.attrs['version'] = data_version(info)
+            return df
+        except OSError:
+            pass  # Unreadable cache file, fall through and rebuild it
+
+    # Streamed caches hold aggregates, which can't absorb new rows directly
+    previous = _compatible_source_info(spec, parquet_path, info_path, mode)
+    if previous is not None and not streaming:
+        try:
+            df = _merge_added_rows(spec, resolution, parquet_path, info_path, previous)
+        except (OSError, pa.ArrowInvalid):
+            df = None
+        if df is not None:
+            return df
+
+    if streaming:
+        parse = lambda: stream_series(spec, chunk_bytes=chunk_bytes, progress=progress)
+    else:
+        parse = lambda: read_filtered_csv(spec)
+    read = lambda: add_time_axis(parse(), resolution)
+    return _build_cache(spec, read, parquet_path, info_path, mode)
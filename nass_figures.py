@@ -0,0 +1,716 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+from nass_analytics import series_labels
+from nass_data import SUPPRESSION_CODES, frame_version
+from nass_stats import ROLLING_WINDOW
+
+# The dashboard's original colours come first; longer series lists continue
+# through Plotly's qualitative palettes so any number of series can be drawn
+STATE_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']  # Blue, Orange, Green, Red
+CROP_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1']  # Red, Teal, Blue
+INDEX_COLOR = '#8B4513'  # Brown color for food commodities
+
+LEGEND_HINT = "💡 Click legend to hide/show<br>Double-click to isolate"
+
+# Finished figures kept per process and shared by every session
+FIGURE_CACHE_SIZE = int(os.environ.get("NASS_FIGURE_CACHE_SIZE", 32))
+
+
+def series_colors(n, base):
+    palette = list(base) + [
+        color for color in qualitative.Plotly + qualitative.Dark24 + qualitative.Light24
+        if color not in base
+    ]
+    return [palette[i % len(palette)] for i in range(n)]
+
+
+# Pivot a long NASS frame to a year x series matrix in one pass, one column
+# per series as series_labels names them. Returns the sorted years, the
+# series names and the float value matrix (NaN where a series has no value
+# for a year).
+def pivot_series(df, series_col):
+    wide = (
+        df['Value_Clean'].groupby([df['Year'], series_labels(df, series_col)], observed=True)
+        .first()
+        .unstack(-1)
+        .sort_index()
+    )
+    names = [str(name) for name in wide.columns]
+    return wide.index.to_numpy(), names, wide.to_numpy(dtype=float)
+
+
+# Rank of every series within each year (1 = highest) and the number of
+# series reporting that year, computed for the whole matrix at once
+def rank_by_year(matrix):
+    filled = np.where(np.isnan(matrix), -np.inf, matrix)
+    order = np.argsort(-filled, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, matrix.shape[1] + 1), axis=1)
+    reporting = (~np.isnan(matrix)).sum(axis=1)
+    return ranks, reporting
+
+
+# Points whose value QuickStats withheld, per series name (see
+# series_labels): their x values (`x_col`) and suppression codes
+def suppressed_by_series(df, series_col, x_col):
+    if 'Suppressed' not in df.columns:
+        return {}
+    withheld = df['Suppressed'].notna() & df['Value_Clean'].isna() & df[x_col].notna()
+    rows = df.loc[withheld, [x_col, 'Suppressed']]
+    rows.insert(0, series_col, series_labels(df, series_col)[withheld])
+    rows = rows.drop_duplicates([series_col, x_col])
+    return {
+        str(name): (group[x_col].to_numpy(), group['Suppressed'].astype(str).to_numpy())
+        for name, group in rows.groupby(series_col, observed=True)
+    }
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').view('int64').astype(float)
+    return x.astype(float)
+
+
+# One marker trace for every withheld point. Each marker sits on its series'
+# line, interpolated between the published neighbours, in the series colour,
+# and its hover names the suppression code, so gaps are explained instead of
+# silently dropped. `points` holds (name, color, x, y, suppressed x, codes)
+# per series; returns None when nothing was withheld.
+def suppressed_trace(points, marker_size=8, show_legend=True, x_hover='Year: %{x}'):
+    xs, ys, colors, customdata = [], [], [], []
+    for name, color, x, y, x_suppressed, codes in points:
+        if not len(x) or not len(x_suppressed):
+            continue
+        xs.append(x_suppressed)
+        ys.append(np.interp(_as_float(x_suppressed), _as_float(x), y))
+        colors += [color] * len(codes)
+        customdata += [(name, code, SUPPRESSION_CODES.get(code, '')) for code in codes]
+    if not xs:
+        return None
+
+    return go.Scatter(
+        x=np.concatenate(xs),
+        y=np.concatenate(ys),
+        customdata=customdata,
+        mode='markers',
+        name='Suppressed',
+        marker=dict(symbol='x-thin-open', size=marker_size + 2, color=colors,
+                    line=dict(width=2, color=colors)),
+        hovertemplate='<b>%{customdata[0]}</b><br>' +
+                     x_hover + '<br>' +
+                     'Suppressed %{customdata[1]}: %{customdata[2]}<br>' +
+                     '<extra></extra>',
+        showlegend=show_legend,
+    )
+
+
+# Line chart of a long NASS frame, one trace per series. Suppressed values are
+# marked on the lines.
+def build_line_figure(df, series_col, **options):
+    years, names, matrix = pivot_series(df, series_col)
+    return build_matrix_line_figure(years, names, matrix,
+                                    suppressed=suppressed_by_series(df, series_col, 'Year'),
+                                    **options)
+
+
+# Line chart with one trace per column of a year x series matrix (NaN where
+# a series has no value). `hover_value` is the hovertemplate line for the y
+# value; with more than one series (and `show_rank`) each point's hover also
+# shows its rank within that year. `suppressed` maps series names to the
+# (years, codes) of their withheld values.
+def build_matrix_line_figure(years, names, matrix, *, title, xaxis_title, yaxis_title,
+                             hover_value, tickformat, colors=STATE_COLORS, name_format=None,
+                             tick0=None, dtick=1, line_width=3, marker_size=8,
+                             show_legend=True, hover_extra='', suppressed=None, show_rank=True):
+    ranks, reporting = rank_by_year(matrix)
+    trace_colors = series_colors(len(names), colors)
+    rank_hover = ''
+    if show_rank and len(names) > 1:
+        rank_hover = 'Rank: %{customdata[0]} of %{customdata[1]}<br>'
+    suppressed = suppressed or {}
+
+    fig = go.Figure()
+    for j, name in enumerate(names):
+        observed = ~np.isnan(matrix[:, j])
+        if not observed.any():
+            continue  # e.g. a ratio of two series that never overlap
+        fig.add_trace(go.Scatter(
+            x=years[observed],
+            y=matrix[observed, j],
+            customdata=np.column_stack((ranks[observed, j], reporting[observed])),
+            mode='lines+markers',
+            name=name_format(name) if name_format else name,
+            line=dict(width=line_width, color=trace_colors[j]),
+            marker=dict(size=marker_size, color=trace_colors[j]),
+            hovertemplate='<b>%{fullData.name}</b><br>' +
+                         'Year: %{x}<br>' +
+                         hover_value + '<br>' +
+                         rank_hover +
+                         hover_extra +
+                         '<extra></extra>',
+            showlegend=show_legend
+        ))
+
+    trace = suppressed_trace(
+        [
+            (name_format(name) if name_format else name, trace_colors[j],
+             years[~np.isnan(matrix[:, j])], matrix[~np.isnan(matrix[:, j]), j])
+            + suppressed[name]
+            for j, name in enumerate(names) if name in suppressed
+        ],
+        marker_size=marker_size, show_legend=show_legend,
+    )
+    if trace is not None:
+        fig.add_trace(trace)
+
+    layout = dict(
+        title={
+            'text': title,
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 20}
+        },
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title,
+        xaxis=dict(
+            tickmode='linear',
+            tick0=years.min() if tick0 is None and len(years) else tick0,
+            dtick=dtick,
+            tickfont=dict(size=12),
+            title_font=dict(size=14)
+        ),
+        yaxis=dict(
+            tickformat=tickformat,
+            tickfont=dict(size=12),
+            title_font=dict(size=14)
+        ),
+        showlegend=show_legend,
+        width=800,
+        height=500,
+        hovermode='x',  # This gives the vertical line without the bottom summary
+    )
+    if show_legend:
+        layout.update(_legend_layout())
+    fig.update_layout(**layout)
+    return fig
+
+
+# Interactive legend, hover label styling and the usage hint shared by every
+# multi-series line chart
+def _legend_layout():
+    return dict(
+        legend=dict(
+            orientation="v",
+            yanchor="top",
+            y=1,
+            xanchor="left",
+            x=1.02,
+            font=dict(size=12),
+            itemclick="toggle",  # Enables hide/show functionality
+            itemdoubleclick="toggleothers"  # Double-click to show only that series
+        ),
+        hoverlabel=dict(
+            bgcolor="white",
+            bordercolor="black",
+            font_size=12,
+            font_family="Arial"
+        ),
+        annotations=[
+            dict(
+                text=LEGEND_HINT,
+                xref="paper", yref="paper",
+                x=1.01, y=0.72,  # Positioned to prevent cutoff
+                xanchor="left", yanchor="top",
+                showarrow=False,
+                font=dict(size=9, color="gray"),
+                bgcolor="rgba(255,255,255,0.9)",
+                bordercolor="lightgray",
+                borderwidth=1
+            )
+        ]
+    )
+
+
+# ================================
+# High-resolution series
+# ================================
+
+# Above this many points in a chart, traces switch to WebGL and drop markers
+WEBGL_POINT_THRESHOLD = 1000
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+
+
+# Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the
+# visual shape of the (x, y) line. x must be increasing.
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = x.astype(float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area)) if end > start else start
+        selected[i + 1] = a
+    return np.unique(selected)
+
+
+# Min/max decimation: both end points, and the lowest and highest point of
+# each of (n_out - 2) / 2 equal-width buckets between them, found with one
+# lexsort. Returns at most n_out points.
+def minmax_decimate(y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    buckets = (n_out - 2) // 2
+    if not buckets:
+        return np.array([0, n - 1])
+    edges = np.linspace(1, n - 1, buckets + 1).astype(int)
+    bucket_of = np.repeat(np.arange(buckets), np.diff(edges))
+    order = np.lexsort((y[1:n - 1], bucket_of)) + 1
+    non_empty = edges[1:] > edges[:-1]
+    lows = order[edges[:-1][non_empty] - 1]
+    highs = order[edges[1:][non_empty] - 2]
+    return np.unique(np.concatenate(([0], lows, highs, [n - 1])))
+
+
+def downsample(x, y, n_out, method='lttb'):
+    if method == 'minmax':
+        return minmax_decimate(y, n_out)
+    return lttb(x, y, n_out)
+
+
+# Dated (monthly/weekly) line chart. Only the points inside `window`
+# (a (start, end) pair of dates) are considered, and each series is decimated
+# so the whole chart stays within `point_budget` points. Suppressed values
+# inside the window are marked on the lines.
+def build_timeseries_figure(df, series_col, *, title, yaxis_title, hover_value, tickformat,
+                            colors=STATE_COLORS, name_format=None, window=None,
+                            point_budget=2000, method='lttb'):
+    shown = df['Value_Clean'].notna() & df['Date'].notna()
+    frame = df.loc[shown, ['Date', 'Value_Clean']]
+    frame.insert(0, series_col, series_labels(df, series_col)[shown])
+    frame = frame.sort_values([series_col, 'Date'], ignore_index=True)
+    names = frame[series_col].astype(str).to_numpy()
+    dates = frame['Date'].to_numpy(dtype='datetime64[ns]')
+    values = frame['Value_Clean'].to_numpy(dtype=float)
+
+    # Contiguous slice per series, trimmed to the window with binary search
+    boundaries = np.flatnonzero(names[1:] != names[:-1]) + 1
+    starts = np.concatenate(([0], boundaries)) if len(names) else np.array([], dtype=int)
+    ends = np.concatenate((boundaries, [len(names)])) if len(names) else np.array([], dtype=int)
+    per_series_budget = max(point_budget // max(len(starts), 1), 3)
+
+    series = []
+    total_points = 0
+    for start, end in zip(starts, ends):
+        x, y = dates[start:end], values[start:end]
+        if window is not None:
+            lo = np.searchsorted(x, np.datetime64(window[0], 'ns'))
+            hi = np.searchsorted(x, np.datetime64(window[1], 'ns'), side='right')
+            x, y = x[lo:hi], y[lo:hi]
+        total_points += len(x)
+        keep = downsample(x.view('int64'), y, per_series_budget, method)
+        series.append((names[start], x[keep], y[keep]))
+
+    suppressed = suppressed_by_series(df, series_col, 'Date')
+    withheld = []
+    for name, x, y in series:
+        if name in suppressed:
+            x_suppressed, codes = suppressed[name]
+            x_suppressed = x_suppressed.astype('datetime64[ns]')
+            if window is not None:
+                inside = ((x_suppressed >= np.datetime64(window[0], 'ns'))
+                          & (x_suppressed <= np.datetime64(window[1], 'ns')))
+                x_suppressed, codes = x_suppressed[inside], codes[inside]
+            withheld.append((name, x, y, x_suppressed, codes))
+
+    shown_points = sum(len(x) for _, x, _ in series)
+    use_webgl = shown_points > WEBGL_POINT_THRESHOLD
+    trace_type = go.Scattergl if use_webgl else go.Scatter
+    trace_colors = series_colors(len(series), colors)
+
+    fig = go.Figure()
+    for j, (name, x, y) in enumerate(series):
+        fig.add_trace(trace_type(
+            x=x,
+            y=y,
+            mode='lines' if use_webgl else 'lines+markers',
+            name=name_format(name) if name_format else name,
+            line=dict(width=2, color=trace_colors[j]),
+            marker=dict(size=5, color=trace_colors[j]),
+            hovertemplate='<b>%{fullData.name}</b><br>' +
+                         'Date: %{x|%b %d, %Y}<br>' +
+                         hover_value + '<br>' +
+                         '<extra></extra>'
+        ))
+
+    color_of = {name: trace_colors[j] for j, (name, _, _) in enumerate(series)}
+    trace = suppressed_trace(
+        [(name_format(name) if name_format else name, color_of[name], x, y, x_suppressed, codes)
+         for name, x, y, x_suppressed, codes in withheld],
+        marker_size=5, x_hover='Date: %{x|%b %d, %Y}',
+    )
+    if trace is not None:
+        fig.add_trace(trace)
+    suppressed_count = sum(len(codes) for *_, codes in withheld)
+
+    fig.update_layout(
+        title={
+            'text': title,
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 20}
+        },
+        xaxis_title='Date',
+        yaxis_title=yaxis_title,
+        xaxis=dict(type='date', tickfont=dict(size=12), title_font=dict(size=14)),
+        yaxis=dict(tickformat=tickformat, tickfont=dict(size=12), title_font=dict(size=14)),
+        width=800,
+        height=500,
+        hovermode='x',
+        **_legend_layout()
+    )
+    fig.add_annotation(
+        text=f"Showing {shown_points:,} of {total_points:,} points"
+             + (f" ({method.upper()} downsampled)" if shown_points < total_points else "")
+             + (f" · {suppressed_count:,} suppressed" if suppressed_count else ""),
+        xref="paper", yref="paper", x=0, y=1.06, xanchor="left", showarrow=False,
+        font=dict(size=10, color="gray")
+    )
+    return fig
+
+
+# Latest-value bar chart straight from a series summary table (or any other
+# `value_col` of a frame indexed by name)
+def build_bar_figure(summary, series_col, *, title, value_label, tickformat,
+                     colors=STATE_COLORS, name_format=None, value_col='latest_value'):
+    names = [name_format(name) if name_format else name for name in summary.index]
+
+    fig = go.Figure(go.Bar(
+        x=names,
+        y=summary[value_col].to_numpy(),
+        marker_color=series_colors(len(names), colors),
+        hovertemplate=f'{series_col}=%{{x}}<br>{value_label}=%{{y}}<extra></extra>'
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=series_col,
+        yaxis_title=value_label,
+        showlegend=False,
+        yaxis_tickformat=tickformat,
+        title_x=0.5
+    )
+    return fig
+
+
+# ================================
+# Figure cache
+# ================================
+
+# Bounded LRU of built figures. Streamlit only reads the figures it is given
+# (it serializes a copy), so one instance can be handed to every session.
+class FigureCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        return self.lookup(key, build)[0]
+
+    # The figure for `key` and whether it was already cached
+    def lookup(self, key, build):
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key], True
+            self.misses += 1
+
+        # Built outside the lock so one slow figure doesn't block other sessions
+        fig = build()
+
+        with self._lock:
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return fig, False
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._figures), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+FIGURE_CACHE = FigureCache(FIGURE_CACHE_SIZE)
+
+
+# Build `builder(df, *params)` once per (builder, data version, params). The
+# data version is the frame's own unless `version` is given, as it is for
+# derived data such as series statistics or query results.
+def cached_figure(builder, df, *params, version=None):
+    return figure_lookup(builder, df, *params, version=version)[0]
+
+
+# cached_figure that also reports whether the figure came from the cache
+def figure_lookup(builder, df, *params, version=None):
+    key = (builder.__name__, frame_version(df) if version is None else version, params)
+    return FIGURE_CACHE.lookup(key, lambda: builder(df, *params))
+
+
+# ================================
+# Dashboard charts
+# ================================
+
+# "2013-2025" (or "2025") for the years a frame covers
+def year_span(df):
+    first, last = int(df['Year'].min()), int(df['Year'].max())
+    return f"{first}-{last}" if first < last else f"{first}"
+
+
+def cropland_trend_figure(df):
+    return build_line_figure(
+        df, 'State',
+        title=f'Cropland Asset Value by State ({year_span(df)})',
+        xaxis_title='Year',
+        yaxis_title='Value ($ per Acre)',
+        hover_value='Value: $%{y:,.0f}/acre',
+        tickformat='$,.0f',
+        colors=STATE_COLORS,
+    )
+
+
+def crop_price_trend_figure(df):
+    return build_line_figure(
+        df, 'Commodity',
+        title='Crop Prices by Commodity (Marketing Years)',
+        xaxis_title='Marketing Year',
+        yaxis_title='Price ($ per Bushel)',
+        hover_value='Price: $%{y:.2f}/bushel',
+        tickformat='$,.2f',
+        colors=CROP_COLORS,
+        name_format=str.title,
+    )
+
+
+def index_trend_figure(df):
+    fig = build_line_figure(
+        df, 'Commodity',
+        title='Food Commodities Price Index (Annual, Base Year 2011 = 100)',
+        xaxis_title='Year',
+        yaxis_title='Price Index (Base Year 2011 = 100)',
+        hover_value='Index Value: %{y:.1f}',
+        hover_extra='(Base Year 2011 = 100)<br>',
+        tickformat='.1f',
+        colors=[INDEX_COLOR],
+        name_format=lambda name: f"{name.title()} Price Index",
+        dtick=2,  # Show every 2 years for better readability
+        line_width=4,
+        marker_size=10,
+        show_legend=False,  # Single line doesn't need legend
+    )
+
+    # Add a horizontal line at 100 to show the base year
+    fig.add_hline(y=100, line_dash="dash", line_color="gray",
+                  annotation_text="Base Year (2011) = 100",
+                  annotation_position="bottom right")
+    return fig
+
+
+# Crop prices deflated by the Food Commodities Price Index (a SeriesBlock
+# from nass_analytics.deflate)
+def real_crop_price_figure(real_prices):
+    return build_matrix_line_figure(
+        real_prices.years, list(real_prices.names), real_prices.values,
+        title='Real Crop Prices by Commodity (2011 Dollars)',
+        xaxis_title='Marketing Year',
+        yaxis_title='Price (2011 $ per Bushel)',
+        hover_value='Real Price: $%{y:.2f}/bushel',
+        hover_extra='(Deflated by the Food Commodities Price Index)<br>',
+        tickformat='$,.2f',
+        colors=CROP_COLORS,
+        name_format=str.title,
+        dtick=5,
+    )
+
+
+# Cropland $/acre over crop $/bu per state for one commodity, i.e. how many
+# bushels an acre of cropland is worth (a SeriesBlock from nass_analytics.ratio)
+def land_crop_ratio_figure(ratios, commodity):
+    columns = [j for j, name in enumerate(ratios.names) if name.endswith(f" / {commodity}")]
+    return build_matrix_line_figure(
+        ratios.years, [ratios.names[j] for j in columns], ratios.values[:, columns],
+        title=f'Cropland Value in Bushels of {commodity.title()} by State',
+        xaxis_title='Year',
+        yaxis_title='Bushels per Acre of Cropland',
+        hover_value='Ratio: %{y:,.0f} bu/acre',
+        tickformat=',.0f',
+        colors=STATE_COLORS,
+        name_format=lambda name: name.split(' / ')[0].title(),
+        dtick=2,
+    )
+
+
+# Per-year statistics (a nass_stats.SeriesStatistics) drawn like the trend
+# charts: matrix attribute -> (title, axis title, hover line, tick format,
+# scale to the plotted unit)
+STATISTIC_CHARTS = {
+    'yoy': ('Year-over-Year Change', 'Change (%)', 'Change: %{y:+.1f}%', '.0f', 100),
+    'volatility': (f'Rolling {ROLLING_WINDOW}-Year Volatility', 'Volatility (%)',
+                   'Volatility: %{y:.1f}%', '.0f', 100),
+    'drawdown': ('Drawdown from Peak', 'Change from Peak (%)', 'Drawdown: %{y:.1f}%', '.0f', 100),
+    'rank': ('Rank by Year', 'Rank (1 = highest)', 'Rank: %{y:.0f}', 'd', 1),
+}
+
+
+def build_statistic_figure(stats, statistic, subject, **options):
+    title, yaxis_title, hover_value, tickformat, scale = STATISTIC_CHARTS[statistic]
+    fig = build_matrix_line_figure(
+        stats.years, list(stats.names), getattr(stats, statistic) * scale,
+        title=f'{subject}: {title}',
+        yaxis_title=yaxis_title,
+        hover_value=hover_value,
+        tickformat=tickformat,
+        show_rank=False,
+        line_width=2,
+        marker_size=6,
+        **options,
+    )
+    if statistic == 'rank':
+        fig.update_yaxes(autorange='reversed', dtick=1)
+    elif statistic in ('yoy', 'drawdown'):
+        fig.add_hline(y=0, line_color="gray", line_width=1)
+    return fig
+
+
+def cropland_statistic_figure(stats, statistic):
+    return build_statistic_figure(stats, statistic, 'Cropland Value', xaxis_title='Year',
+                                  colors=STATE_COLORS, dtick=2)
+
+
+def crop_price_statistic_figure(stats, statistic):
+    return build_statistic_figure(stats, statistic, 'Crop Prices', xaxis_title='Marketing Year',
+                                  colors=CROP_COLORS, name_format=str.title, dtick=5)
+
+
+def index_statistic_figure(stats, statistic):
+    return build_statistic_figure(stats, statistic, 'Food Commodities Price Index',
+                                  xaxis_title='Year', colors=[INDEX_COLOR], dtick=2,
+                                  name_format=lambda name: f"{name.title()} Price Index",
+                                  show_legend=False)
+
+
+def cropland_latest_bar(summary, latest_year):
+    return build_bar_figure(
+        summary, 'State',
+        title=f'Cropland Values by State - {latest_year}',
+        value_label='Value ($ per Acre)',
+        tickformat='$,.0f',
+        colors=STATE_COLORS,
+    )
+
+
+def crop_price_latest_bar(summary, latest_year):
+    return build_bar_figure(
+        summary, 'Commodity',
+        title=f'Crop Prices by Commodity - {latest_year} Marketing Year',
+        value_label='Price ($ per Bushel)',
+        tickformat='$,.2f',
+        colors=CROP_COLORS,
+        name_format=str.title,
+    )
+
+
+# Chart of a SQL query result (a nass_sql.QueryResult) in the dashboard's
+# styling: a line per `series` value of `y` over a numeric `x` such as Year,
+# or bars of `y` by a text `x`
+def query_result_figure(result, x, y, series=None):
+    columns = list(dict.fromkeys(column for column in (x, y, series) if column))
+    df = result.table.select(columns).to_pandas()
+    df = df[df[x].notna()]
+    title = f'{y} by {x}' + (f' and {series}' if series else '')
+    if df[x].dtype.kind not in 'iuf':
+        bars = df.groupby(df[x].astype(str), sort=False, observed=True)[[y]].first()
+        return build_bar_figure(bars, x, title=title, value_label=y, tickformat=',.2f',
+                                value_col=y)
+
+    long = df.assign(**{'Year': df[x], 'Value_Clean': df[y].astype(float),
+                        '_series': df[series].astype(str) if series else y})
+    years, names, matrix = pivot_series(long, '_series')
+    span = float(years.max() - years.min()) if len(years) else 0.0
+    if years.dtype.kind in 'iu':
+        dtick = max(1, int(np.ceil(span / 15)))
+    else:
+        dtick = span / 10 or 1
+    return build_matrix_line_figure(
+        years, names, matrix,
+        title=title,
+        xaxis_title=x,
+        yaxis_title=y,
+        hover_value=f'{y}: %{{y:,.2f}}',
+        tickformat=',.2f',
+        colors=STATE_COLORS,
+        dtick=dtick,
+        show_legend=series is not None,
+    )
+
+
+def crop_price_timeseries_figure(df, resolution, window, point_budget, method):
+    return build_timeseries_figure(
+        df, 'Commodity',
+        title=f'Crop Prices by Commodity ({resolution.title()})',
+        yaxis_title='Price ($ per Bushel)',
+        hover_value='Price: $%{y:.2f}/bushel',
+        tickformat='$,.2f',
+        colors=CROP_COLORS,
+        name_format=str.title,
+        window=window,
+        point_budget=point_budget,
+        method=method,
+    )
+
+
+def index_timeseries_figure(df, resolution, window, point_budget, method):
+    fig = build_timeseries_figure(
+        df, 'Commodity',
+        title=f'Food Commodities Price Index ({resolution.title()}, Base Year 2011 = 100)',
+        yaxis_title='Price Index (Base Year 2011 = 100)',
+        hover_value='Index Value: %{y:.1f}',
+        tickformat='.1f',
+        colors=[INDEX_COLOR],
+        name_format=lambda name: f"{name.title()} Price Index",
+        window=window,
+        point_budget=point_budget,
+        method=method,
+    )
+    fig.add_hline(y=100, line_dash="dash", line_color="gray",
+                  annotation_text="Base Year (2011) = 100",
+                  annotation_position="bottom right")
+    return fig
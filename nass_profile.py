@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Lightweight spans for finding the slow part of a dashboard rerun. Each span
+# records wall time and the change in resident memory; a disabled profiler
+# records nothing.
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# Current resident set size in bytes (None where /proc isn't available)
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Run:
+    def __init__(self, label):
+        self.label = label
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.spans = []
+
+
+class Profiler:
+    def __init__(self, enabled=True, max_runs=20):
+        self.enabled = enabled
+        self.runs = deque(maxlen=max_runs)
+        self.current = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start_run(self, label):
+        if self.enabled:
+            self.current = Run(label)
+
+    def end_run(self):
+        run, self.current = self.current, None
+        if run is not None:
+            run.duration = time.perf_counter() - run.start
+            with self._lock:
+                self.runs.append(run)
+        return run
+
+    # Run scope for code that may execute outside a full rerun (fragment
+    # reruns): opens a run of its own only if none is in progress
+    @contextmanager
+    def run_scope(self, label):
+        if not self.enabled or self.current is not None:
+            yield
+            return
+        self.start_run(label)
+        try:
+            yield
+        finally:
+            self.end_run()
+
+    # Time the block. Extra details (e.g. cache="hit") can be passed in or set
+    # on the yielded dict.
+    @contextmanager
+    def span(self, name, category="app", **args):
+        if not self.enabled or self.current is None:
+            yield args
+            return
+
+        run = self.current
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            rss_after = rss_bytes()
+            self._local.depth = depth
+            run.spans.append({
+                "name": name,
+                "category": category,
+                "start": start - run.start,
+                "duration": end - start,
+                "depth": depth,
+                "thread": threading.get_ident(),
+                "rss": rss_after,
+                "rss_delta": None if rss_before is None else rss_after - rss_before,
+                "args": args,
+            })
+
+    def recent_runs(self):
+        with self._lock:
+            return list(self.runs)
+
+    def to_json(self, runs=None, caches=None):
+        runs = self.recent_runs() if runs is None else runs
+        return json.dumps({
+            "runs": [
+                {"label": run.label, "started": run.started, "duration": run.duration,
+                 "spans": sorted(run.spans, key=lambda span: span["start"])}
+                for run in runs
+            ],
+            "caches": cache_stats() if caches is None else caches,
+        }, indent=2, default=str)
+
+    # Chrome trace event format (chrome://tracing, Perfetto): one complete
+    # event per span plus a memory counter track, runs laid out in time order
+    def to_chrome_trace(self, runs=None):
+        runs = self.recent_runs() if runs is None else runs
+        pid = os.getpid()
+        events = []
+        for run in runs:
+            base = run.started * 1e6
+            events.append({"name": run.label, "cat": "run", "ph": "X", "pid": pid, "tid": 0,
+                           "ts": base, "dur": (run.duration or 0) * 1e6})
+            for span in run.spans:
+                ts = base + span["start"] * 1e6
+                events.append({"name": span["name"], "cat": span["category"], "ph": "X",
+                               "pid": pid, "tid": span["thread"], "ts": ts,
+                               "dur": span["duration"] * 1e6,
+                               "args": {key: str(value) for key, value in span["args"].items()}})
+                if span["rss"] is not None:
+                    events.append({"name": "rss", "ph": "C", "pid": pid,
+                                   "ts": ts + span["duration"] * 1e6,
+                                   "args": {"MB": round(span["rss"] / 2**20, 1)}})
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+# Stand-in used when profiling is off; its spans cost a generator call
+NULL_PROFILER = Profiler(enabled=False)
+
+
+# Hit/miss counts for a memoizing cache that doesn't report them itself
+# (st.cache_data, st.cache_resource): the cached function calls miss() when
+# it actually runs, and callers go through call()
+class CacheCounter:
+    def __init__(self):
+        self.calls = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def miss(self):
+        self._local.missed = True
+        with self._lock:
+            self.misses += 1
+
+    # Call `function` and return its result with "hit" or "miss"
+    def call(self, function, *args, **kwargs):
+        self._local.missed = False
+        result = function(*args, **kwargs)
+        with self._lock:
+            self.calls += 1
+        return result, "miss" if self._local.missed else "hit"
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "hits": self.calls - self.misses, "misses": self.misses}
+
+
+CACHE_COUNTERS = {}
+_counters_lock = threading.Lock()
+
+
+def cache_counter(name):
+    with _counters_lock:
+        return CACHE_COUNTERS.setdefault(name, CacheCounter())
+
+
+def cache_stats():
+    with _counters_lock:
+        counters = dict(CACHE_COUNTERS)
+    return {name: counter.stats() for name, counter in counters.items()}
@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from nass_analytics import series_labels, shared_series
+from nass_data import SERIES_INDEX_KEYS, content_version, frame_version, series_order
+
+# Series index over a loaded frame. Cached frames keep the rows of each series
+# (geography, commodity, data item, period) together and sorted by year, so
+# a series is a (first row, end row) range: looking one up is a dict access,
+# and a selection only touches the rows it returns.
+
+# Rows are addressed by position = series number << 16 | year + YEAR_OFFSET,
+# which increases along the frame, so any (series, year) bound is one binary
+# search away
+YEAR_OFFSET = 1 << 15
+
+
+@dataclass(frozen=True, eq=False)
+class SeriesIndex:
+    frame: pd.DataFrame  # rows in series order
+    keys: tuple  # series key columns present in the frame
+    slices: dict  # series key -> (first row, end row)
+    key_values: dict  # key column -> that column's value for each series
+    starts: np.ndarray  # first row of each series
+    ends: np.ndarray  # end row of each series
+    positions: np.ndarray  # position of each row (see YEAR_OFFSET)
+    shared: dict  # key column -> its values that cover several data items
+    version: str
+
+    # The rows of one series, a view of the frame
+    def series(self, key):
+        start, end = self.slices[key]
+        return self.frame.iloc[start:end]
+
+    # Distinct (non-empty) values of one key column
+    def values(self, column):
+        return sorted({value for value in self.key_values[column] if value is not None})
+
+    # Name of each series as summaries and charts label it: its `series_col`
+    # value, or its data item where that value covers several (see series_labels)
+    def series_labels(self, series_col):
+        keys = pd.DataFrame({column: self.key_values[column] for column in self.keys})
+        keys.attrs['shared_series'] = self.shared
+        return series_labels(keys, series_col).to_numpy(dtype=object)
+
+    # Distinct (non-empty) series labels, e.g. the options of a series filter
+    def label_values(self, series_col):
+        return sorted({label for label in self.series_labels(series_col) if label is not None})
+
+    def year_range(self):
+        years = self.frame['Year']
+        return (int(years.min()), int(years.max())) if len(years) else None
+
+    # Row ranges (first, end) of the series whose key columns take one of the
+    # allowed values in `where` ({column: values}) and, with `labels`
+    # ((series column, names)), whose series label is one of the names, each
+    # cut to the years within `years` (first, last); adjacent ranges are merged
+    def ranges(self, where=None, years=None, labels=None):
+        chosen = np.ones(len(self.starts), dtype=bool)
+        for column, values in (where or {}).items():
+            chosen &= np.isin(self.key_values[column], list(values))
+        if labels is not None:
+            series_col, names = labels
+            chosen &= np.isin(self.series_labels(series_col), list(names))
+        series = np.flatnonzero(chosen)
+        starts, ends = self.starts[series], self.ends[series]
+        if years is not None:
+            bounds = np.clip(years, -YEAR_OFFSET, YEAR_OFFSET - 1) + YEAR_OFFSET
+            base = series.astype(np.int64) << 16
+            starts = np.searchsorted(self.positions, base + bounds[0])
+            ends = np.searchsorted(self.positions, base + bounds[1], side='right')
+        starts, ends = starts[starts < ends], ends[starts < ends]
+        if not len(starts):
+            return []
+        breaks = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+        starts, ends = starts[np.r_[0, breaks]], ends[np.r_[breaks - 1, len(ends) - 1]]
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    # Rows of the selected series within `years`. A single run of rows (one
+    # series, or neighbouring ones over all their years) is a view of the
+    # frame; otherwise only the selected rows are copied. The result carries
+    # its own content version, and the frame's shared series so its series
+    # are labelled as in the whole frame.
+    def select(self, where=None, years=None, labels=None):
+        ranges = self.ranges(where, years, labels)
+        if len(ranges) == 1:
+            selected = self.frame.iloc[ranges[0][0]:ranges[0][1]]
+        else:
+            starts, ends = np.array(ranges, dtype=np.int64).reshape(-1, 2).T
+            lengths = ends - starts
+            rows = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths,
+                                                        lengths)
+            selected = self.frame.take(rows)
+        where = sorted((column, tuple(sorted(values))) for column, values in (where or {}).items())
+        if labels is not None:
+            labels = (labels[0], tuple(sorted(labels[1])))
+        selected.attrs = {'version': content_version(self.version, where, years, labels),
+                          'shared_series': self.shared}
+        return selected
+
+
+# Index the series of a frame, sorting a copy first unless its rows are
+# already in series order (as frames from the dataset cache are)
+def build_series_index(df):
+    version = frame_version(df)
+    shared = df.attrs.get('shared_series')
+    order = series_order(df)
+    if not np.array_equal(order, np.arange(len(df))):
+        df = df.take(order).reset_index(drop=True)
+        df.attrs = {'version': version}
+
+    keys = tuple(column for column in SERIES_INDEX_KEYS if column in df.columns)
+    if not len(df):
+        empty = np.array([], dtype=np.int64)
+        return SeriesIndex(frame=df, keys=keys, slices={},
+                           key_values={column: np.array([], dtype=object) for column in keys},
+                           starts=empty, ends=empty, positions=empty, shared=shared or {},
+                           version=version)
+
+    codes = np.array([df[column].cat.codes.to_numpy() for column in keys]).reshape(len(keys), -1)
+    starts = np.flatnonzero(np.r_[True, (np.diff(codes, axis=1) != 0).any(axis=0)])
+    ends = np.r_[starts[1:], len(df)].astype(starts.dtype)
+
+    key_values = {}
+    for column, column_codes in zip(keys, codes[:, starts]):
+        labels = np.append(df[column].cat.categories.astype(str).to_numpy(dtype=object), None)
+        key_values[column] = labels[column_codes]  # code -1 picks the trailing None
+    names = list(zip(*key_values.values())) if keys else [()] * len(starts)
+    if shared is None:
+        series_keys = pd.DataFrame(key_values)
+        shared = {column: shared_series(series_keys, column) for column in keys
+                  if column != 'Data Item'}
+    series = np.repeat(np.arange(len(starts), dtype=np.int64), ends - starts)
+    positions = (series << 16) + df['Year'].to_numpy().astype(np.int64) + YEAR_OFFSET
+    return SeriesIndex(
+        frame=df,
+        keys=keys,
+        slices={name: (int(start), int(end)) for name, start, end in zip(names, starts, ends)},
+        key_values=key_values,
+        starts=starts,
+        ends=ends,
+        positions=positions,
+        shared=shared,
+        version=version,
+    )
@@ -0,0 +1,198 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pyarrow as pa
+
+from nass_data import DATASETS, content_version, frame_version, load_dataset
+
+# Ad hoc SQL over the NASS datasets, run in-process by DuckDB. Each dataset is
+# a table of the same name (cropland, crop_prices, index_pricing) scanned
+# straight from the loaded frames, and results come back as Arrow tables.
+# Results are cached by SQL text and the versions of the data queried. Every
+# query runs under a row and time budget on a bounded share of the CPU, with
+# no access to files or extensions, so one heavy query can't stall the
+# sessions sharing the server.
+#
+#     from nass_sql import query
+#     query("SELECT State, max(Value_Clean) FROM cropland GROUP BY State").table
+
+# Rows a result may have; larger results are cut off and flagged as truncated
+QUERY_ROW_LIMIT = int(os.environ.get("NASS_QUERY_ROW_LIMIT", 100_000))
+# Seconds a query may take, including waiting for a free slot
+QUERY_TIMEOUT = float(os.environ.get("NASS_QUERY_TIMEOUT", 10))
+# Queries running at once, and the DuckDB threads and memory they share
+QUERY_SLOTS = int(os.environ.get("NASS_QUERY_SLOTS", 2))
+QUERY_THREADS = int(os.environ.get("NASS_QUERY_THREADS", 2))
+QUERY_MEMORY_LIMIT = os.environ.get("NASS_QUERY_MEMORY_LIMIT", "1GB")
+QUERY_CACHE_SIZE = int(os.environ.get("NASS_QUERY_CACHE_SIZE", 64))
+
+RESULT_BATCH_ROWS = 10_000
+
+
+class QueryError(Exception):
+    pass
+
+
+class QueryBudgetExceeded(QueryError):
+    pass
+
+
+# One query result: the Arrow table (at most `max_rows` rows), whether rows
+# were cut off, and how long the query ran. `version` identifies the result
+# by its SQL text and the versions of the data queried.
+@dataclass(frozen=True, eq=False)
+class QueryResult:
+    table: pa.Table
+    truncated: bool
+    seconds: float
+    version: str
+
+
+# The statement as it is cached: trailing semicolons and surrounding
+# whitespace don't make a different query
+def normalize_sql(sql):
+    return re.sub(r'[\s;]+$', '', sql.strip())
+
+
+# The single SELECT statement in `sql`; anything else (writes, settings,
+# several statements) is refused before it runs
+def parse_select(sql):
+    import duckdb
+
+    try:
+        statements = duckdb.extract_statements(sql)
+    except duckdb.Error as exc:
+        raise QueryError(str(exc)) from None
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise QueryError("Only a single SELECT statement can be run")
+    return statements[0]
+
+
+class QueryEngine:
+    def __init__(self, max_rows=QUERY_ROW_LIMIT, timeout=QUERY_TIMEOUT, slots=QUERY_SLOTS,
+                 threads=QUERY_THREADS, memory_limit=QUERY_MEMORY_LIMIT,
+                 cache_size=QUERY_CACHE_SIZE):
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self.threads = threads
+        self.memory_limit = memory_limit
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._database = None
+        self._results = OrderedDict()
+        self._slots = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+
+    # One in-memory database per engine, opened on first use. Queries only see
+    # the frames registered on their own cursor.
+    def _connect(self):
+        import duckdb
+
+        with self._lock:
+            if self._database is None:
+                self._database = duckdb.connect(":memory:", config={
+                    "threads": self.threads,
+                    "memory_limit": self.memory_limit,
+                    "enable_external_access": False,
+                    "autoinstall_known_extensions": False,
+                    "autoload_known_extensions": False,
+                    "lock_configuration": True,
+                })
+            return self._database
+
+    def query(self, sql, tables, max_rows=None, timeout=None):
+        return self.lookup(sql, tables, max_rows, timeout)[0]
+
+    # The result of `sql` over `tables` ({table name: frame}) and whether it
+    # was already cached. Failed queries aren't cached.
+    def lookup(self, sql, tables, max_rows=None, timeout=None):
+        sql = normalize_sql(sql)
+        max_rows = self.max_rows if max_rows is None else max_rows
+        timeout = self.timeout if timeout is None else timeout
+        versions = tuple(sorted((name, frame_version(df)) for name, df in tables.items()))
+        key = (sql, versions, max_rows)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key], True
+            self.misses += 1
+
+        result = self._run(sql, tables, max_rows, timeout, content_version(*key))
+
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return result, False
+
+    # Run the statement, streaming its result until max_rows + 1 rows have
+    # arrived (the extra row only flags truncation; the rest is never
+    # computed). The time budget covers the wait for a slot; a query still
+    # running when it is spent is interrupted.
+    def _run(self, sql, tables, max_rows, timeout, version):
+        import duckdb
+
+        statement = parse_select(sql)
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            raise QueryBudgetExceeded(f"No query slot came free within {timeout:g} s; "
+                                      "try again shortly")
+        try:
+            cursor = self._connect().cursor()
+            timer = threading.Timer(max(timeout - (time.perf_counter() - started), 0),
+                                    cursor.interrupt)
+            try:
+                for name, df in tables.items():
+                    cursor.register(name, df)
+                timer.start()
+                reader = cursor.execute(statement).to_arrow_reader(RESULT_BATCH_ROWS)
+                batches, rows = [], 0
+                for batch in reader:
+                    batches.append(batch)
+                    rows += batch.num_rows
+                    if rows > max_rows:
+                        break
+                table = pa.Table.from_batches(batches, schema=reader.schema)
+            except duckdb.InterruptException:
+                raise QueryBudgetExceeded(f"Query ran longer than {timeout:g} s") from None
+            except duckdb.Error as exc:
+                raise QueryError(str(exc)) from None
+            finally:
+                timer.cancel()
+                cursor.close()
+        finally:
+            self._slots.release()
+        return QueryResult(table.slice(0, max_rows), table.num_rows > max_rows,
+                           time.perf_counter() - started, version)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._results), "max_entries": self.cache_size,
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+# Shared by every session of the server process
+QUERY_ENGINE = QueryEngine()
+
+
+# Every registered dataset as loaded by the dashboard, by table name
+def dataset_tables():
+    return {name: load_dataset(name) for name in DATASETS}
+
+
+# Run `sql` over the datasets (or the given {table name: frame} tables) and
+# return a QueryResult whose `table` is a pyarrow.Table
+def query(sql, tables=None, max_rows=None, timeout=None):
+    return QUERY_ENGINE.query(sql, dataset_tables() if tables is None else tables,
+                              max_rows, timeout)
@@ -0,0 +1,208 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from nass_analytics import align, series_labels
+
+SUMMARY_COLUMNS = [
+    'earliest_year', 'earliest_value', 'latest_year', 'latest_value', 'growth_pct',
+    'min_value', 'min_year', 'max_value', 'max_year', 'rank',
+]
+
+
+# One row per series (state, commodity, ..., told apart by data item where
+# one has several; see series_labels) computed in a single groupby pass:
+# first/last observation, growth between them, extremes with their years and
+# the rank by latest value (1 = highest)
+def summarize_series(df, series_col):
+    observed = df.loc[df['Value_Clean'].notna(), ['Year', 'Value_Clean']]
+    observed.insert(0, series_col, series_labels(df, series_col).loc[observed.index])
+    if observed.empty:
+        summary = pd.DataFrame(columns=SUMMARY_COLUMNS)
+        summary.attrs.update(df.attrs)
+        return summary
+
+    observed = observed.sort_values([series_col, 'Year'], ignore_index=True)
+    grouped = observed.groupby(series_col, observed=True)
+    summary = grouped.agg(
+        earliest_year=('Year', 'first'),
+        earliest_value=('Value_Clean', 'first'),
+        latest_year=('Year', 'last'),
+        latest_value=('Value_Clean', 'last'),
+        min_value=('Value_Clean', 'min'),
+        max_value=('Value_Clean', 'max'),
+    )
+
+    values = grouped['Value_Clean']
+    summary['min_year'] = observed['Year'].to_numpy()[values.idxmin().to_numpy()]
+    summary['max_year'] = observed['Year'].to_numpy()[values.idxmax().to_numpy()]
+    summary['growth_pct'] = (
+        (summary['latest_value'] - summary['earliest_value']) / summary['earliest_value'] * 100
+    )
+    summary['rank'] = summary['latest_value'].rank(ascending=False, method='min').astype(int)
+    summary.index = summary.index.astype(str)
+
+    summary = summary[SUMMARY_COLUMNS]
+    summary.attrs.update(df.attrs)  # Keeps the source data version
+    return summary
+
+
+# The newest year any series reports and the summary rows reporting it,
+# which the latest-year comparison bars are drawn from
+def latest_year_rows(summary):
+    latest_year = summary['latest_year'].max()
+    return latest_year, summary[summary['latest_year'] == latest_year]
+
+
+# ================================
+# Year x series statistics
+# ================================
+
+# Trailing window (in years) of the rolling volatility, and the fewest
+# year-over-year changes inside it that give a value
+ROLLING_WINDOW = 5
+MIN_PERIODS = 3
+
+
+# Sum of the last `window` rows (fewer at the start) for every column at once
+def _trailing_sum(values, window):
+    totals = np.vstack((np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)))
+    rows = np.arange(1, len(values) + 1)
+    return totals[rows] - totals[np.maximum(rows - window, 0)]
+
+
+# Year-over-year change (fraction) between consecutive calendar years
+def year_over_year(years, values, mask):
+    change = np.full(values.shape, np.nan)
+    consecutive = (np.diff(years) == 1)[:, None] & mask[1:] & mask[:-1] & (values[:-1] != 0)
+    np.divide(values[1:], values[:-1], out=change[1:], where=consecutive)
+    return change - 1
+
+
+# Standard deviation of the yearly log returns over the trailing window
+def rolling_volatility(change, window=ROLLING_WINDOW, min_periods=MIN_PERIODS):
+    with np.errstate(invalid='ignore'):
+        returns = np.log1p(change)
+    valid = np.isfinite(returns)
+    returns = np.where(valid, returns, 0.0)
+    count = _trailing_sum(valid.astype(float), window)
+    total = _trailing_sum(returns, window)
+    squares = _trailing_sum(returns ** 2, window)
+    variance = np.divide(squares - total ** 2 / np.maximum(count, 1), count - 1,
+                         out=np.full(change.shape, np.nan), where=count >= min_periods)
+    return np.sqrt(np.maximum(variance, 0))
+
+
+# Fall (fraction, <= 0) from the highest value the series has reached so far
+def drawdown(values, mask):
+    peak = np.fmax.accumulate(values, axis=0)
+    return np.where(mask, values / peak - 1, np.nan)
+
+
+# Rank (1 = highest) among the series observed each year
+def rank_over_time(values, mask):
+    order = np.argsort(np.where(mask, -values, np.inf), axis=1, kind='stable')
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, np.arange(1, values.shape[1] + 1, dtype=float), axis=1)
+    return np.where(mask, ranks, np.nan)
+
+
+TREND_COLUMNS = [
+    'cagr_pct', 'latest_yoy_pct', 'recent_volatility_pct', 'volatility_pct', 'max_drawdown_pct',
+    'drawdown_peak_year', 'drawdown_trough_year', 'current_drawdown_pct', 'peak_year',
+    'years_ranked_first', 'years_ranked',
+]
+
+
+# Per-year statistics of every series in one frame, computed on the year x
+# series matrix with whole-array operations, so the cost grows with the
+# matrix size rather than with a loop over series. `version` follows the
+# source data version.
+@dataclass(frozen=True, eq=False)
+class SeriesStatistics:
+    years: np.ndarray
+    names: tuple
+    values: np.ndarray
+    mask: np.ndarray
+    yoy: np.ndarray
+    volatility: np.ndarray
+    drawdown: np.ndarray
+    rank: np.ndarray
+    endpoints: pd.DataFrame
+    version: str
+
+    # One row per series: compound annual growth, the latest year-over-year
+    # change and rolling volatility, volatility over the whole history, the
+    # deepest and current drawdown with their years, and how often the series
+    # ranked first
+    def table(self):
+        if not len(self.years):
+            return pd.DataFrame(columns=TREND_COLUMNS)
+        columns = np.arange(len(self.names))
+        last = len(self.years) - 1 - np.argmax(self.mask[::-1], axis=0)
+        ends = self.endpoints.reindex(list(self.names))
+        span = (ends['latest_year'] - ends['earliest_year']).to_numpy(dtype=float)
+        growth = (ends['latest_value'] / ends['earliest_value']).to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cagr = np.where((span > 0) & (growth > 0), growth ** (1 / span) - 1, np.nan)
+            returns = np.log1p(self.yoy)
+        returns = np.where(np.isfinite(returns), returns, np.nan)
+        deepest = np.argmin(np.where(self.mask, self.drawdown, np.inf), axis=0)
+        peak_row = np.argmax(np.where(self.mask, self.values, -np.inf), axis=0)
+        # Row of the running peak each year, to date the peak a drawdown fell from
+        at_peak = self.mask & (self.drawdown == 0)
+        running_peak = np.maximum.accumulate(
+            np.where(at_peak, np.arange(len(self.years))[:, None], 0), axis=0
+        )
+        contested = self.mask.sum(axis=1) > 1
+
+        table = pd.DataFrame({
+            'cagr_pct': cagr * 100,
+            'latest_yoy_pct': self.yoy[last, columns] * 100,
+            'recent_volatility_pct': self.volatility[last, columns] * 100,
+            'volatility_pct': _nan_std(returns) * 100,
+            'max_drawdown_pct': self.drawdown[deepest, columns] * 100,
+            'drawdown_peak_year': self.years[running_peak[deepest, columns]],
+            'drawdown_trough_year': self.years[deepest],
+            'current_drawdown_pct': self.drawdown[last, columns] * 100,
+            'peak_year': self.years[peak_row],
+            'years_ranked_first': ((self.rank == 1) & contested[:, None]).sum(axis=0),
+            'years_ranked': (self.mask & contested[:, None]).sum(axis=0),
+        }, index=list(self.names))
+        return table[self.mask.any(axis=0)]
+
+
+# Standard deviation of each column ignoring NaN (NaN with fewer than two values)
+def _nan_std(values):
+    count = np.isfinite(values).sum(axis=0)
+    filled = np.where(np.isfinite(values), values, 0.0)
+    mean = filled.sum(axis=0) / np.maximum(count, 1)
+    squares = (np.where(np.isfinite(values), values - mean, 0.0) ** 2).sum(axis=0)
+    return np.where(count > 1, np.sqrt(squares / np.maximum(count - 1, 1)), np.nan)
+
+
+def series_statistics(df, series_col, window=ROLLING_WINDOW):
+    block = align({'series': (df, series_col)}).block('series')
+    values, mask = block.values, block.mask
+    change = year_over_year(block.years, values, mask)
+    return SeriesStatistics(
+        years=block.years,
+        names=block.names,
+        values=values,
+        mask=mask,
+        yoy=change,
+        volatility=rolling_volatility(change, window),
+        drawdown=drawdown(values, mask),
+        rank=rank_over_time(values, mask),
+        endpoints=block.endpoints(),
+        version=f"{block.version}-{window}",
+    )
+
+
+# "1st", "2nd", "3rd", "4th", ... for ranking text
+def ordinal(n):
+    if 11 <= n % 100 <= 13:
+        return f"{n}th"
+    suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
@@ -0,0 +1,198 @@
+import io
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from nass_data import SUPPRESSION_CODES, frame_version
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Exports are written this many rows at a time so no full-size copy of the
+# table is ever built in memory
+EXPORT_CHUNK_ROWS = 100_000
+
+
+# Display columns that sort by another column: `Value` holds the formatted
+# text of `Value_Clean`
+SORT_COLUMNS = {'Value': 'Value_Clean'}
+
+
+# Sortable key for any column: category codes (categories are stored sorted),
+# numbers as-is, otherwise a sorted factorization
+def _sort_key(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy()
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy()
+    return pd.factorize(column, sort=True)[0]
+
+
+def _sort_column(df, column):
+    return df[SORT_COLUMNS[column]] if SORT_COLUMNS.get(column) in df.columns else df[column]
+
+
+# Row order of a frame for the given sort and filter, computed once per data
+# version and shared by every session and viewer
+@st.cache_resource(max_entries=64, show_spinner=False)
+def view_order(version, sort_by, filter_col, selected, _df):
+    order = np.lexsort([_sort_key(_sort_column(_df, column)) for column in reversed(sort_by)])
+    if filter_col and selected:
+        keep = _df[filter_col].isin(selected).to_numpy()
+        order = order[keep[order]]
+    return order
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def filter_options(version, filter_col, _df):
+    column = _df[filter_col]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return [str(value) for value in column.cat.categories]
+    return sorted(str(value) for value in column.dropna().unique())
+
+
+# "3 values suppressed: (D) 2 · (NA) 1" for the given rows, or None
+def suppression_summary(suppressed, order):
+    codes = suppressed.cat.codes.to_numpy()[order]
+    counts = np.bincount(codes[codes >= 0], minlength=len(suppressed.cat.categories))
+    if not counts.any():
+        return None
+    found = [(code, count) for code, count in zip(suppressed.cat.categories, counts) if count]
+    return (f"{counts.sum():,} value{'s' if counts.sum() != 1 else ''} suppressed: "
+            + " · ".join(f"{code} {count:,}" for code, count in found))
+
+
+def _rows(df, order, columns, labels):
+    rows = df.iloc[order, [df.columns.get_loc(column) for column in columns]]
+    return rows.rename(columns=labels or {})
+
+
+def export_csv(df, order, columns, labels=None):
+    buffer = io.BytesIO()
+    for start in range(0, max(len(order), 1), EXPORT_CHUNK_ROWS):
+        chunk = _rows(df, order[start:start + EXPORT_CHUNK_ROWS], columns, labels)
+        chunk.to_csv(buffer, header=start == 0, index=False)
+    return buffer.getvalue()
+
+
+def export_parquet(df, order, columns, labels=None):
+    buffer = io.BytesIO()
+    writer = None
+    for start in range(0, max(len(order), 1), EXPORT_CHUNK_ROWS):
+        chunk = _rows(df, order[start:start + EXPORT_CHUNK_ROWS], columns, labels)
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(buffer, table.schema)
+        writer.write_table(table)
+    writer.close()
+    return buffer.getvalue()
+
+
+# Paginated table: filtering and sorting happen on the server against a
+# cached sort order, and only the visible page of the projected columns is
+# sent to the browser. Exports are built on request.
+def data_viewer(df, columns, sort_by, key, filter_col=None, labels=None):
+    version = frame_version(df)
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        selected = []
+        if filter_col:
+            selected = st.multiselect(f"Filter by {filter_col}",
+                                      filter_options(version, filter_col, _df=df),
+                                      key=f"{key}_filter")
+    with col2:
+        sort_col = st.selectbox("Sort by", columns, index=columns.index(sort_by[0]),
+                                format_func=lambda column: (labels or {}).get(column, column),
+                                key=f"{key}_sort")
+    with col3:
+        descending = st.toggle("Descending", key=f"{key}_descending")
+
+    sort_keys = (sort_col,) + tuple(column for column in sort_by if column != sort_col)
+    order = view_order(version, sort_keys, filter_col, tuple(selected), _df=df)
+    if descending:
+        order = order[::-1]
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+    page_count = max(math.ceil(len(order) / page_size), 1)
+    # The page lives in session state only, so it can be clamped when a filter
+    # shrinks the result
+    st.session_state.setdefault(f"{key}_page", 1)
+    if st.session_state[f"{key}_page"] > page_count:
+        st.session_state[f"{key}_page"] = page_count
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=page_count, key=f"{key}_page")
+
+    start = (page - 1) * page_size
+    visible = order[start:start + page_size]
+    st.dataframe(_rows(df, visible, columns, labels), hide_index=True, use_container_width=True)
+    st.caption(f"Rows {min(start + 1, len(order)):,}-{start + len(visible):,} of {len(order):,}"
+               f" · page {page:,} of {page_count:,}")
+    summary = suppression_summary(df['Suppressed'], order) if 'Suppressed' in df.columns else None
+    if summary:
+        st.caption(summary, help="\n\n".join(
+            f"{code} {description}" for code, description in SUPPRESSION_CODES.items()))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Prepare CSV export", key=f"{key}_csv"):
+            st.download_button("⬇️ Download CSV", export_csv(df, order, columns, labels),
+                               file_name=f"{key}.csv", mime="text/csv", on_click="ignore")
+    with col2:
+        if st.button("Prepare Parquet export", key=f"{key}_parquet"):
+            st.download_button("⬇️ Download Parquet", export_parquet(df, order, columns, labels),
+                               file_name=f"{key}.parquet", mime="application/octet-stream",
+                               on_click="ignore")
+
+
+# Hidden debug panel: where the time of a rerun went, span by span, and how
+# often the data and figure caches were hit. Spans can be downloaded as JSON
+# or as a Chrome trace (chrome://tracing, ui.perfetto.dev).
+def profiling_panel(profiler, caches):
+    with st.sidebar.expander("🐞 Profiling", expanded=True):
+        runs = profiler.recent_runs()
+        if not runs:
+            st.caption("No reruns recorded yet.")
+            return
+
+        index = st.selectbox(
+            "Rerun", range(len(runs) - 1, -1, -1),
+            format_func=lambda i: f"#{i + 1} {runs[i].label} ({runs[i].duration * 1000:,.0f} ms)",
+            key="profiling_run",
+        )
+        run = runs[index]
+        spans = sorted(run.spans, key=lambda span: span["start"])
+        accounted = sum(span["duration"] for span in spans if span["depth"] == 0)
+        st.caption(f"{run.duration * 1000:,.1f} ms total · "
+                   f"{(run.duration - accounted) * 1000:,.1f} ms outside spans")
+
+        table = pd.DataFrame({
+            "Span": ["· " * span["depth"] + span["name"] for span in spans],
+            "ms": [span["duration"] * 1000 for span in spans],
+            "% of run": [span["duration"] / run.duration * 100 for span in spans],
+            "Cache": [span["args"].get("cache", "") for span in spans],
+            "Δ RSS (MB)": [
+                None if span["rss_delta"] is None else span["rss_delta"] / 2**20 for span in spans
+            ],
+        })
+        st.dataframe(table.round(2), hide_index=True, use_container_width=True)
+
+        st.dataframe(
+            pd.DataFrame(caches).T.rename_axis("Cache").reset_index(),
+            hide_index=True, use_container_width=True,
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Spans JSON", profiler.to_json(caches=caches),
+                               file_name="nass-profile.json", mime="application/json",
+                               on_click="ignore")
+        with col2:
+            st.download_button("Chrome trace", profiler.to_chrome_trace(),
+                               file_name="nass-trace.json", mime="application/json",
+                               on_click="ignore")
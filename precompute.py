@@ -0,0 +1,221 @@
+import argparse
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import plotly.io as pio
+
+import nass_figures
+from nass_data import (
+    frame_version,
+    load_dataset,
+    prefers_streaming,
+    read_shared_frame,
+    write_atomic,
+)
+from nass_stats import latest_year_rows, summarize_series
+
+# Precomputed frames, summaries and figures for the dashboard's
+# "serve precomputed" mode (NASS_SERVE_PRECOMPUTED=1)
+ARTIFACT_DIR = os.environ.get("NASS_ARTIFACT_DIR", "artifacts")
+
+# Bump whenever the artifact layout or a figure builder changes
+ARTIFACT_VERSION = 6
+
+MANIFEST = "manifest.json"
+
+# Dataset -> series column of its summary, and the sub-annual resolutions
+# the dashboard can draw it at
+DATASETS = {
+    'cropland': ('State', ()),
+    'crop_prices': ('Commodity', ('monthly', 'weekly')),
+    'index_pricing': ('Commodity', ('monthly', 'weekly')),
+}
+
+# Figure builder -> the dataset it draws and whether it takes the full frame
+# or the latest-year summary rows, exactly as the dashboard calls it
+FIGURES = {
+    'cropland_trend_figure': ('cropland', 'frame'),
+    'cropland_latest_bar': ('cropland', 'latest'),
+    'crop_price_trend_figure': ('crop_prices', 'frame'),
+    'crop_price_latest_bar': ('crop_prices', 'latest'),
+    'index_trend_figure': ('index_pricing', 'frame'),
+}
+
+
+def frame_key(name, resolution='annual'):
+    return name if resolution == 'annual' else f"{name}.{resolution}"
+
+
+def _artifact_path(artifact_dir, filename):
+    return os.path.join(artifact_dir, filename)
+
+
+# Artifact files are named after the artifact version and the data version
+# they were built from, so bumping ARTIFACT_VERSION rebuilds all of them
+def _artifact_name(stem, version, extension):
+    return f"{stem}-v{ARTIFACT_VERSION}-{version}.{extension}"
+
+
+def _write_parquet(df, path):
+    write_atomic(path, lambda tmp_path: df.to_parquet(tmp_path, index=df.index.name is not None))
+
+
+# ---- Workers (run in the process pool) ----
+
+# Load (and cache) one dataset at one resolution and write it out, together
+# with its summary for the annual frame. Artifacts already on disk for this
+# data and artifact version are not rewritten.
+def build_frame(artifact_dir, name, resolution):
+    df = load_dataset(name, streaming=prefers_streaming(name), resolution=resolution)
+    version = frame_version(df)
+    key = frame_key(name, resolution)
+    entry = {"version": version, "frame": _artifact_name(key, version, "parquet")}
+    if not os.path.exists(_artifact_path(artifact_dir, entry["frame"])):
+        _write_parquet(df, _artifact_path(artifact_dir, entry["frame"]))
+
+    if resolution == 'annual':
+        entry["summary"] = _artifact_name(f"{key}.summary", version, "parquet")
+        if not os.path.exists(_artifact_path(artifact_dir, entry["summary"])):
+            summary = summarize_series(df, DATASETS[name][0])
+            summary.index.name = DATASETS[name][0]
+            _write_parquet(summary, _artifact_path(artifact_dir, entry["summary"]))
+    return key, entry
+
+
+def render_figure(artifact_dir, figure, dataset_entry):
+    path = _artifact_path(artifact_dir, _artifact_name(figure, dataset_entry['version'], "json"))
+    if not os.path.exists(path):
+        builder = getattr(nass_figures, figure)
+        if FIGURES[figure][1] == 'frame':
+            fig = builder(pd.read_parquet(_artifact_path(artifact_dir, dataset_entry["frame"])))
+        else:
+            summary = pd.read_parquet(_artifact_path(artifact_dir, dataset_entry["summary"]))
+            latest_year, latest_rows = latest_year_rows(summary)
+            fig = builder(latest_rows, latest_year)
+
+        def write(tmp_path):
+            with open(tmp_path, "w") as f:
+                f.write(pio.to_json(fig, validate=False))
+
+        write_atomic(path, write)
+    return figure, os.path.basename(path)
+
+
+# ---- Driver ----
+
+# Build every frame, summary and figure across a process pool. Figures are
+# queued as soon as the frame they draw is written, so slow datasets don't
+# hold up the others. The manifest is replaced last, so a dashboard serving
+# the previous set never sees a half-written one; files it no longer
+# references are removed afterwards.
+def precompute(artifact_dir=ARTIFACT_DIR, workers=None, log=print):
+    os.makedirs(artifact_dir, exist_ok=True)
+    manifest = {
+        "artifact_version": ARTIFACT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        "frames": {},
+        "figures": {},
+    }
+
+    with ProcessPoolExecutor(workers) as pool:
+        frame_jobs = [
+            pool.submit(build_frame, artifact_dir, name, resolution)
+            for name, (_, resolutions) in DATASETS.items()
+            for resolution in ('annual',) + resolutions
+        ]
+        figure_jobs = []
+        for job in frame_jobs:
+            key, entry = job.result()
+            manifest["frames"][key] = entry
+            log(f"frame   {key} ({entry['version']})")
+            figure_jobs.extend(
+                pool.submit(render_figure, artifact_dir, figure, entry)
+                for figure, (dataset, _) in FIGURES.items() if dataset == key
+            )
+        for job in figure_jobs:
+            figure, filename = job.result()
+            manifest["figures"][figure] = filename
+            log(f"figure  {figure}")
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    write_atomic(_artifact_path(artifact_dir, MANIFEST), write)
+
+    referenced = {MANIFEST} | set(manifest["figures"].values()) | {
+        filename for entry in manifest["frames"].values()
+        for field, filename in entry.items() if field != "version"
+    }
+    for filename in os.listdir(artifact_dir):
+        if filename not in referenced and not filename.endswith(".tmp"):
+            os.remove(_artifact_path(artifact_dir, filename))
+    return manifest
+
+
+# ---- Readers (used by the dashboard) ----
+
+# The current manifest, or None when nothing has been precomputed (or it was
+# written by an incompatible version)
+def read_manifest(artifact_dir=ARTIFACT_DIR):
+    try:
+        with open(_artifact_path(artifact_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("artifact_version") != ARTIFACT_VERSION:
+        return None
+    return manifest
+
+
+def manifest_stamp(artifact_dir=ARTIFACT_DIR):
+    try:
+        return os.stat(_artifact_path(artifact_dir, MANIFEST)).st_mtime_ns
+    except OSError:
+        return None
+
+
+# Frames and summaries carry the data version they were built from, so the
+# dashboard's figure and view caches key on it exactly as for live data
+def _read_versioned(artifact_dir, filename, version):
+    df = read_shared_frame(_artifact_path(artifact_dir, filename))
+    df.attrs['version'] = version
+    return df
+
+
+def read_frame(manifest, name, resolution='annual', artifact_dir=ARTIFACT_DIR):
+    entry = manifest["frames"][frame_key(name, resolution)]
+    return _read_versioned(artifact_dir, entry["frame"], entry["version"])
+
+
+def read_summary(manifest, name, artifact_dir=ARTIFACT_DIR):
+    entry = manifest["frames"][name]
+    summary = _read_versioned(artifact_dir, entry["summary"], entry["version"])
+    summary.index.name = None
+    return summary
+
+
+def read_figure(manifest, figure, artifact_dir=ARTIFACT_DIR):
+    with open(_artifact_path(artifact_dir, manifest["figures"][figure])) as f:
+        return pio.from_json(f.read(), skip_invalid=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precompute the dashboard's frames, summaries and figures.")
+    parser.add_argument("--out", default=ARTIFACT_DIR, help="artifact directory")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    manifest = precompute(args.out, args.workers)
+    print(f"{len(manifest['frames'])} frames and {len(manifest['figures'])} figures "
+          f"written to {args.out} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import argparse
+import datetime
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import requests
+from requests.adapters import HTTPAdapter
+
+from nass_data import DATASETS, load_dataset, write_atomic
+
+# QuickStats API endpoint (override with NASS_API_URL, e.g. for the local
+# stand-in server in mock_quickstats.py) and the key it requires
+API_URL = os.environ.get("NASS_API_URL", "https://quickstats.nass.usda.gov/api")
+API_KEY = os.environ.get("NASS_API_KEY")
+
+# The API refuses any query that would return more rows than this
+ROW_LIMIT = 50_000
+
+# Responses worth retrying; anything else is a bad query
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Export (CSV download) column -> API field. Ingested data is written in the
+# export layout so the dashboard reads it exactly like a hand-downloaded file.
+EXPORT_COLUMNS = {
+    'Program': 'source_desc',
+    'Year': 'year',
+    'Period': 'reference_period_desc',
+    'Week Ending': 'week_ending',
+    'Geo Level': 'agg_level_desc',
+    'State': 'state_name',
+    'State ANSI': 'state_ansi',
+    'Ag District': 'asd_desc',
+    'Ag District Code': 'asd_code',
+    'County': 'county_name',
+    'County ANSI': 'county_ansi',
+    'Zip Code': 'zip_5',
+    'Region': 'region_desc',
+    'watershed_code': 'watershed_code',
+    'Watershed': 'watershed_desc',
+    'Commodity': 'commodity_desc',
+    'Data Item': 'short_desc',
+    'Domain': 'domain_desc',
+    'Domain Category': 'domaincat_desc',
+    'Value': 'Value',
+    'CV (%)': 'CV (%)',
+}
+
+EXPORT_SCHEMA = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+
+
+class QuickStatsError(Exception):
+    pass
+
+
+class RowLimitExceeded(QuickStatsError):
+    pass
+
+
+# One API query: fixed field filters plus an inclusive year range, which is
+# what gets halved when a query is over the row limit
+@dataclass(frozen=True)
+class Query:
+    params: tuple
+    years: tuple
+
+    def to_params(self):
+        return dict(self.params, year__GE=self.years[0], year__LE=self.years[1])
+
+    def split(self):
+        first, last = self.years
+        if first == last:
+            return None
+        middle = (first + last) // 2
+        # Newest half first, matching the export's row order
+        return [replace(self, years=(middle + 1, last)), replace(self, years=(first, middle))]
+
+
+# Fan a base filter out over year ranges of `span` years x commodities x
+# states. Year ranges run newest first (and each covers every commodity and
+# state) so the written file can be ordered newest year first, like an export.
+def build_queries(base, years, commodities=(None,), states=(None,), span=10):
+    first, last = years
+    ranges = [(max(end - span + 1, first), end) for end in range(last, first - 1, -span)]
+    queries = []
+    for years_range in ranges:
+        for commodity in commodities:
+            for state in states:
+                params = dict(base)
+                if commodity:
+                    params['commodity_desc'] = commodity
+                if state:
+                    params['state_name'] = state
+                queries.append(Query(tuple(sorted(params.items())), years_range))
+    return queries
+
+
+# Thread-safe limiter spacing requests at least 1/rate seconds apart
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Pooled, rate-limited client. Every worker thread shares one HTTP session,
+# so connections are kept alive across queries.
+class QuickStatsClient:
+    def __init__(self, api_key=API_KEY, base_url=API_URL, max_workers=8, rate=5.0,
+                 retries=4, backoff=0.5, timeout=60, row_limit=ROW_LIMIT):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.row_limit = row_limit
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # GET with retries on connection errors, throttling and server errors,
+    # backing off exponentially (or as long as Retry-After asks)
+    def _get(self, endpoint, params):
+        params = dict(params, format="JSON")
+        if self.api_key:
+            params['key'] = self.api_key
+        url = f"{self.base_url}/{endpoint}/"
+
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error = QuickStatsError(f"{endpoint}: {exc}")
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                message = response.text[:200]
+                if "no data" in message:
+                    return {"data": []}  # Rows vanished since the query was counted
+                if "exceeds limit" in message:
+                    raise RowLimitExceeded(message)
+                if response.status_code not in RETRY_STATUSES:
+                    raise QuickStatsError(f"{endpoint} returned {response.status_code}: {message}")
+                error = QuickStatsError(f"{endpoint} returned {response.status_code}: {message}")
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = int(retry_after)
+            if attempt < self.retries:
+                time.sleep(delay)
+        raise error
+
+    def count(self, query):
+        return int(self._get("get_counts", query.to_params())["count"])
+
+    # Queries covering `query` that each fit under the row limit; empty ones are dropped
+    def plan(self, query):
+        rows = self.count(query)
+        if rows == 0:
+            return []
+        if rows <= self.row_limit:
+            return [query]
+        halves = query.split()
+        if halves is None:
+            raise RowLimitExceeded(f"{rows:,} rows for a single year: {query.to_params()}")
+        return [part for half in halves for part in self.plan(half)]
+
+    # Rows of one query as an export-layout table (all strings, "" for blanks)
+    def fetch(self, query):
+        try:
+            rows = self._get("api_GET", query.to_params())["data"]
+        except RowLimitExceeded:
+            # The data grew between planning and fetching
+            halves = query.split()
+            if halves is None:
+                raise
+            return pa.concat_tables([self.fetch(half) for half in halves])
+        columns = {
+            column: pa.array([str(row.get(field) or "").strip() for row in rows], pa.string())
+            for column, field in EXPORT_COLUMNS.items()
+        }
+        return pa.Table.from_pydict(columns, schema=EXPORT_SCHEMA)
+
+    # Plan and fetch all queries concurrently. Tables are yielded in query
+    # order as soon as each is ready, so nothing waits for the whole pull.
+    def fetch_all(self, queries):
+        return (table for _, table in self.fetch_each(queries))
+
+    # fetch_all, with each table paired with the query (of `queries`) it answers
+    def fetch_each(self, queries):
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix="quickstats") as pool:
+            planned = [(query, part) for query, parts in zip(queries, pool.map(self.plan, queries))
+                       for part in parts]
+            tables = pool.map(self.fetch, [part for _, part in planned])
+            yield from ((query, table) for (query, _), table in zip(planned, tables))
+
+
+# Default pulls reproducing the bundled exports (plus the sub-annual rows the
+# monthly/weekly views use), from the first year each dataset covers
+DATASET_QUERIES = {
+    'cropland': dict(
+        base={'source_desc': 'SURVEY', 'agg_level_desc': 'STATE', 'domain_desc': 'TOTAL',
+              'short_desc': 'AG LAND, CROPLAND - ASSET VALUE, MEASURED IN $ / ACRE'},
+        first_year=1997,
+        states=('INDIANA', 'KENTUCKY', 'OHIO', 'TENNESSEE'),
+    ),
+    'crop_prices': dict(
+        base={'source_desc': 'SURVEY', 'agg_level_desc': 'NATIONAL', 'domain_desc': 'TOTAL',
+              'statisticcat_desc': 'PRICE RECEIVED', 'unit_desc': '$ / BU'},
+        first_year=1975,
+        commodities=('CORN', 'SOYBEANS', 'WHEAT'),
+    ),
+    'index_pricing': dict(
+        base={'source_desc': 'SURVEY', 'agg_level_desc': 'NATIONAL', 'domain_desc': 'TOTAL',
+              'short_desc': 'FOOD COMMODITIES - INDEX FOR PRICE RECEIVED, 2011'},
+        first_year=1990,
+    ),
+}
+
+
+def dataset_queries(name, last_year=None, span=10):
+    pull = DATASET_QUERIES[name]
+    last_year = last_year or datetime.date.today().year
+    return build_queries(pull['base'], (pull['first_year'], last_year),
+                         commodities=pull.get('commodities', (None,)),
+                         states=pull.get('states', (None,)), span=span)
+
+
+# Rows of a fetched table, newest year first. The sort is stable, so rows of
+# one year keep their query and API order.
+def newest_first(table):
+    years = pc.cast(table.column('Year'), pa.int32())
+    return table.take(pc.array_sort_indices(years, order="descending"))
+
+
+# Write every fetched table into the dataset's CSV (swapped in atomically once
+# complete), then refresh its Parquet cache. Returns the rows written. Queries
+# are fetched one year range at a time, newest first, and each range's rows
+# are written newest year first; within a year, rows follow the query order.
+# A refresh that adds a year then only adds rows right after the header, which
+# the dataset cache merges without re-reading the rest of the file.
+def ingest(name, client, queries=None, path=None):
+    queries = queries if queries is not None else dataset_queries(name)
+    queries = sorted(queries, key=lambda query: -query.years[1])
+    path = path or DATASETS[name].path
+    rows = 0
+
+    def write(tmp_path):
+        nonlocal rows
+        options = pa_csv.WriteOptions(quoting_style="all_valid")
+        with pa_csv.CSVWriter(tmp_path, EXPORT_SCHEMA, write_options=options) as writer:
+            fetched = client.fetch_each(queries)
+            for _, tables in itertools.groupby(fetched, key=lambda pair: pair[0].years):
+                table = newest_first(pa.concat_tables(table for _, table in tables))
+                writer.write_table(table)
+                rows += table.num_rows
+
+    write_atomic(path, write)
+    if path == DATASETS[name].path:
+        load_dataset(name)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the dashboard's QuickStats exports.")
+    parser.add_argument("datasets", nargs="*",
+                        help=f"datasets to refresh: {', '.join(DATASET_QUERIES)} (default: all)")
+    parser.add_argument("--last-year", type=int, help="newest year to request (default: this year)")
+    parser.add_argument("--span", type=int, default=10, help="years per query")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent requests")
+    parser.add_argument("--rate", type=float, default=5.0, help="requests per second")
+    parser.add_argument("--base-url", default=API_URL)
+    args = parser.parse_args(argv)
+    unknown = set(args.datasets) - set(DATASET_QUERIES)
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(sorted(unknown))}")
+
+    with QuickStatsClient(base_url=args.base_url, max_workers=args.workers,
+                          rate=args.rate) as client:
+        for name in args.datasets or DATASET_QUERIES:
+            started = time.perf_counter()
+            queries = dataset_queries(name, args.last_year, args.span)
+            rows = ingest(name, client, queries)
+            print(f"{name}: {rows:,} rows from {len(queries)} queries "
+                  f"in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import ast
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# Starts the dashboard with its caches already warm. Before the server takes
+# its first request, every page is run once headless in this process: that
+# builds the Parquet caches on disk, fills the data, series index, statistics
+# and figure caches every session shares, and pays for the imports the
+# dashboard only makes on first use (Plotly's trace classes, DuckDB). The
+# first visitor after a deploy or a scale-up then gets a warm rerun.
+#
+#     python serve.py                          # warm up, then streamlit run
+#     python serve.py -- --server.port 8080    # arguments after -- go to streamlit run
+#     python serve.py --warm-only              # warm the Parquet cache, e.g. in an image build
+#     python serve.py --report --no-warm-up    # startup time report only
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py")
+
+PAGES = ['cropland', 'crop-prices', 'price-index', 'cross-dataset', 'sql']
+
+
+# A headless AppTest session of the dashboard on `page` (a url path in
+# PAGES), not yet run. AppTest has no public way to open a callable st.Page,
+# so the page is selected the way the navigation does, by its url path hash.
+def open_page(page, timeout=600):
+    from streamlit.testing.v1 import AppTest
+    from streamlit.util import calc_md5
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at._page_hash = calc_md5(page)
+    return at
+
+
+# Top-level modules the app script imports, in order
+def app_imports(script=APP):
+    with open(script, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+# (module, self µs, cumulative µs) for every module a fresh interpreter
+# imports while importing `modules`, from its -X importtime log
+def import_times(modules):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=os.path.dirname(APP), capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():  # Skips the header line
+            times.append((name.strip(), int(own), int(cumulative)))
+    return times
+
+
+# Import time per top-level package (its own modules' self times, so the
+# rows add up to the total), largest first
+def import_report(modules, top=15):
+    times = import_times(modules)
+    packages = defaultdict(int)
+    for name, own, _ in times:
+        packages[name.split(".")[0]] += own
+    total = sum(packages.values())
+
+    lines = [f"Imports: {total / 1e6:.2f} s for {len(times)} modules "
+             f"(python -X importtime, {', '.join(modules)})",
+             f"  {'package':30} {'ms':>8} {'share':>7}"]
+    ranked = sorted(packages.items(), key=lambda item: -item[1])
+    for package, own in ranked[:top]:
+        lines.append(f"  {package:30} {own / 1e3:8.1f} {own / total:7.1%}")
+    rest = sum(own for _, own in ranked[top:])
+    if rest:
+        lines.append(f"  {f'({len(ranked) - top} others)':30} {rest / 1e3:8.1f} {rest / total:7.1%}")
+    return "\n".join(lines)
+
+
+# Run every page once in this process. Script runs share the server's
+# process-wide caches (st.cache_resource, the figure cache), so anything a
+# page loads here is a cache hit for the sessions that follow. Returns the
+# seconds each page took.
+def warm_up(pages=PAGES):
+    logging.disable(logging.WARNING)  # AppTest's bare-mode "no runtime" notices
+    timings = {}
+    try:
+        for page in pages:
+            started = time.perf_counter()
+            at = open_page(page).run()
+            if at.exception:
+                raise RuntimeError(f"Warm-up of {page} failed: {at.exception[0].message}")
+            timings[page] = time.perf_counter() - started
+    finally:
+        logging.disable(logging.NOTSET)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Warm the dashboard's caches, report startup time and start the server. "
+                    "Arguments after -- are passed on to streamlit run.")
+    parser.add_argument("--warm-only", action="store_true",
+                        help="exit after warming up instead of starting the server")
+    parser.add_argument("--no-warm-up", dest="warm_up", action="store_false",
+                        help="skip the warm-up")
+    parser.add_argument("--report", action="store_true",
+                        help="also report import time per package (python -X importtime)")
+    parser.add_argument("--top", type=int, default=15, help="packages listed in the report")
+    args, streamlit_args = parser.parse_known_args(argv)
+    if streamlit_args[:1] == ["--"]:
+        streamlit_args = streamlit_args[1:]
+
+    os.chdir(os.path.dirname(APP))  # The dashboard reads its exports and cache relative to here
+    from streamlit.web import bootstrap, cli
+
+    # Load the server's configuration before the warm-up reads it, so starting
+    # the server afterwards finds it unchanged
+    with cli.main_run.make_context("streamlit run", [APP, *streamlit_args]) as ctx:
+        bootstrap.load_config_options({name: value for name, value in ctx.params.items()
+                                       if name not in ("target", "args")})
+    if args.report:
+        print(import_report(app_imports(), args.top), flush=True)
+
+    if args.warm_up:
+        started = time.perf_counter()
+        timings = warm_up()
+        print(f"Warm-up: {time.perf_counter() - started:.2f} s "
+              f"({', '.join(f'{page} {seconds:.2f} s' for page, seconds in timings.items())})",
+              flush=True)
+    if args.warm_only:
+        return
+    cli.main(["run", APP, *streamlit_args], prog_name="streamlit")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,586 +1,1002 @@
+import functools
+import math
+import os
+import threading
+
+import pyarrow as pa
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+
+from nass_analytics import INDEX_BASE_YEAR, align, deflate, ratio
+from nass_data import frame_version, is_cached, load_dataset, prefers_streaming, source_stamp
+from nass_figures import (
+    FIGURE_CACHE,
+    cached_figure,
+    crop_price_latest_bar,
+    crop_price_statistic_figure,
+    crop_price_timeseries_figure,
+    crop_price_trend_figure,
+    cropland_latest_bar,
+    cropland_statistic_figure,
+    cropland_trend_figure,
+    figure_lookup,
+    index_statistic_figure,
+    index_timeseries_figure,
+    index_trend_figure,
+    land_crop_ratio_figure,
+    query_result_figure,
+    real_crop_price_figure,
+    year_span,
+)
+from nass_profile import NULL_PROFILER, Profiler, cache_counter, cache_stats
+from nass_series import build_series_index
+from nass_sql import QUERY_ENGINE, QueryError
+from nass_stats import (
+    ROLLING_WINDOW,
+    latest_year_rows,
+    ordinal,
+    series_statistics,
+    summarize_series,
+)
+from nass_views import data_viewer, profiling_panel
+from precompute import (
+    FIGURES,
+    manifest_stamp,
+    read_figure,
+    read_frame,
+    read_manifest,
+    read_summary,
+)
 
 # Set page config
 st.set_page_config(page_title="Will Faulkner's Agricultural Data Analysis", layout="wide")
 
+# Hidden profiling panel: open the dashboard with ?debug=1 (or set NASS_DEBUG=1)
+# to time every loader, figure, chart and block of each rerun
+DEBUG = os.environ.get("NASS_DEBUG") == "1" or st.query_params.get("debug") == "1"
+if DEBUG and "profiler" not in st.session_state:
+    st.session_state.profiler = Profiler()
+profiler = st.session_state.profiler if DEBUG else NULL_PROFILER
+profiler.start_run("full rerun")
+
 # Title
 st.title("Agricultural Data Analysis Dashboard")
 
 # Add your image with some styling
-col1, col2, col3 = st.columns([1, 2, 1])
-with col2:
-    st.image("Faulkner,Will.jpg", caption="Will Faulkner", width=300)
-
-# Load the Cropland Value data
-@st.cache_data
-def load_cropland_data():
-    df = pd.read_csv("Cropland Value.csv")
-    
-    # Clean the Value column - remove commas and convert to numeric
-    df['Value_Clean'] = df['Value'].str.replace(',', '').astype(float)
-    
-    # Convert Year to numeric
-    df['Year'] = pd.to_numeric(df['Year'])
-    
-    return df
-
-# Load the Crop Prices data
-@st.cache_data
-def load_crop_prices_data():
-    df = pd.read_csv("Crop Prices.csv")
-    
-    # Clean the Value column and convert to numeric
-    df['Value_Clean'] = pd.to_numeric(df['Value'], errors='coerce')
-    
-    # Convert Year to numeric
-    df['Year'] = pd.to_numeric(df['Year'])
-    
-    return df
-
-# Load the Index Pricing data
-@st.cache_data
-def load_index_pricing_data():
-    df = pd.read_csv("Index Pricing.csv")
-    
-    # Clean the Value column and convert to numeric
-    df['Value_Clean'] = pd.to_numeric(df['Value'], errors='coerce')
-    
-    # Convert Year to numeric
-    df['Year'] = pd.to_numeric(df['Year'])
-    
-    # Filter for annual price received information only
-    df = df[df['Period'] == 'YEAR'].copy()
-    
-    return df
-
-# Load data
-df_cropland = load_cropland_data()
-df_crop_prices = load_crop_prices_data()
-df_index_pricing = load_index_pricing_data()
-
-# Add description
-st.write("""
+if os.path.exists("Faulkner,Will.jpg"):
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        st.image("Faulkner,Will.jpg", caption="Will Faulkner", width=300)
+
+# Load one of the registered QuickStats datasets (parsed once into the Parquet cache).
+# `stamp` is the source file's mtime and size: a replaced export gets a new
+# cache entry on the next rerun, and the loader only parses the rows it added.
+# The chunk size doesn't change the result, so it isn't hashed.
+# Frames are held once per process and every session gets the same read-only
+# object (st.cache_data would hand each rerun its own unpickled copy).
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_data(name, stamp, streaming=False, resolution='annual', _chunk_mb=64):
+    cache_counter("data").miss()
+    return load_dataset(name, streaming=streaming, chunk_bytes=_chunk_mb << 20,
+                        resolution=resolution)
+
+# Ingest settings - streaming reads large exports in chunks and keeps only
+# the per-series yearly values that the charts need
+with st.sidebar.expander("⚙️ Data Loading"):
+    ingest_mode = st.radio("Ingest mode", ["Auto", "Full", "Streaming"],
+                           help="Auto streams exports larger than 256 MB")
+    chunk_mb = st.number_input("Chunk size (MB)", min_value=1, max_value=1024, value=64,
+                               help="Larger chunks parse faster but use more memory")
+
+def uses_streaming(name):
+    if ingest_mode == "Auto":
+        return prefers_streaming(name)
+    return ingest_mode == "Streaming"
+
+# "Serve precomputed" mode (NASS_SERVE_PRECOMPUTED=1): frames, summaries and
+# the static charts are read from the artifacts written by `python precompute.py`,
+# so requests never parse exports or build those figures themselves
+SERVE_PRECOMPUTED = os.environ.get("NASS_SERVE_PRECOMPUTED") == "1"
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_manifest(stamp):
+    return read_manifest()
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_precomputed(name, stamp, resolution='annual', _manifest=None):
+    df = read_frame(_manifest, name, resolution)
+    summary = read_summary(_manifest, name) if resolution == 'annual' else None
+    return df, summary
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_precomputed_figure(figure, stamp, _manifest=None):
+    return read_figure(_manifest, figure)
+
+artifacts_stamp = manifest_stamp() if SERVE_PRECOMPUTED else None
+manifest = load_manifest(artifacts_stamp) if artifacts_stamp else None
+if SERVE_PRECOMPUTED and manifest is None:
+    st.warning("No precomputed artifacts found - run `python precompute.py`. Serving live data.")
+
+# Whether the manifest has `builder`'s figure drawn from exactly this data
+# version (a filtered selection has a version of its own)
+def is_precomputed(builder, version):
+    if manifest is None or builder.__name__ not in manifest["figures"]:
+        return False
+    dataset = FIGURES[builder.__name__][0]
+    return version == manifest["frames"][dataset]["version"]
+
+# A dashboard figure: the precomputed one when serving artifacts, otherwise
+# built (once per data version) from the live data. Derived data (statistics,
+# series blocks, query results) passes its own `version`.
+def dashboard_figure(builder, df, *params, version=None):
+    with profiler.span(builder.__name__, "figure") as span:
+        version = frame_version(df) if version is None else version
+        if is_precomputed(builder, version):
+            span["cache"] = "precomputed"
+            return load_precomputed_figure(builder.__name__, artifacts_stamp, _manifest=manifest)
+        fig, hit = figure_lookup(builder, df, *params, version=version)
+        span["cache"] = "hit" if hit else "miss"
+        return fig
+
+# st.plotly_chart serializes the whole figure on every rerun, so it gets its own span
+def show_chart(fig, name):
+    with profiler.span(f"plotly_chart {name}", "render"):
+        st.plotly_chart(fig, use_container_width=True)
+
+# Call a cached loader, counting (and, when profiling, recording) whether it
+# was served from the cache
+def profiled_load(label, cache, loader, *args, **kwargs):
+    with profiler.span(label, "data") as span:
+        result, span["cache"] = cache_counter(cache).call(loader, *args, **kwargs)
+    return result
+
+# Time a whole analysis section. Fragment-only reruns of a section aren't part
+# of a full rerun, so they are recorded as runs of their own.
+def profiled_section(label):
+    def decorate(section):
+        @functools.wraps(section)
+        def run(*args):
+            with profiler.run_scope(f"{label} rerun"), profiler.span(label, "section"):
+                return section(*args)
+        return run
+    return decorate
+
+# Per-series summary (first/last values, growth, extremes, rank) for the
+# metric cards and insights, computed once per dataset in a single pass and
+# shared like the frames
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_summary(name, stamp, series_col, streaming=False):
+    cache_counter("summary").miss()
+    df, _ = cache_counter("data").call(load_data, name, stamp, streaming)
+    return summarize_series(df, series_col)
+
+# Load a dataset and its summary, showing progress while an export is being (re)parsed
+def load_with_progress(name, series_col, label):
+    if manifest is not None:
+        return profiled_load(f"load {name}", "precomputed", load_precomputed, name,
+                             artifacts_stamp, _manifest=manifest)
+
+    load_progress = st.empty()
+
+    def report(fraction):
+        load_progress.progress(fraction, text=f"Loading {label}... {fraction:.0%}")
+
+    streaming, stamp = uses_streaming(name), source_stamp(name)
+    if not is_cached(name, streaming):
+        # Parse outside load_data: the cache would record the progress bar
+        # updates and fail to replay them on later cache hits
+        with profiler.span(f"parse {name}", "data"):
+            load_dataset(name, streaming, chunk_bytes=int(chunk_mb) << 20, progress=report)
+    df = profiled_load(f"load {name}", "data", load_data, name, stamp, streaming,
+                       _chunk_mb=int(chunk_mb))
+    summary = profiled_load(f"summary {name}", "summary", load_summary, name, stamp,
+                            series_col, streaming)
+    load_progress.empty()
+    return df, summary
+
+# Series index of a loaded frame: each series' rows by key, built once per
+# data version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_series_index(version, _df):
+    cache_counter("series index").miss()
+    return build_series_index(_df)
+
+# A filtered dataset and its summary, computed from the selected rows only.
+# `names` are series labels (see SeriesIndex.series_labels), None for all.
+@st.cache_resource(show_spinner=False, max_entries=64)
+def load_selection(version, series_col, names, years, _index):
+    cache_counter("selection").miss()
+    df = _index.select(years=years, labels=None if names is None else (series_col, names))
+    return df, summarize_series(df, series_col)
+
+# Rows of an indexed frame for the series labelled `names` in `series_col`
+# (None for all) within `years` (None for all), e.g. the monthly or weekly rows
+# of the series picked in the sidebar
+@st.cache_resource(show_spinner=False, max_entries=64)
+def load_rows(version, series_col, names, years, _index):
+    cache_counter("selection").miss()
+    return _index.select(years=years, labels=None if names is None else (series_col, names))
+
+FILTER_LABELS = {'State': "States", 'Commodity': "Commodities"}
+
+# Sidebar filters for a page's datasets ({name: (series column, frame,
+# summary)}): a multi-select per dataset with more than one series (none
+# chosen means all) and a year range over all of them. Returns each
+# dataset's frame and summary restricted to the selection - the loaded ones
+# when nothing is filtered out - and the selection itself as (series column,
+# series labels, years), with None for no restriction; or None if a dataset
+# has no rows left.
+def filtered_datasets(loaded, key):
+    indexes = {
+        name: profiled_load(f"series index {name}", "series index", load_series_index,
+                            frame_version(df), _df=df)
+        for name, (_, df, _) in loaded.items()
+    }
+    year_ranges = [index.year_range() for index in indexes.values() if index.year_range()]
+    first = min(first for first, _ in year_ranges)
+    last = max(last for _, last in year_ranges)
+
+    chosen = {}
+    with st.sidebar.expander("🔎 Series Filter", expanded=True):
+        for name, (series_col, _, _) in loaded.items():
+            options = indexes[name].label_values(series_col)
+            if len(options) > 1:
+                label = FILTER_LABELS.get(series_col, series_col)
+                chosen[name] = st.multiselect(label, options, format_func=str.title,
+                                              placeholder=f"All {label.lower()}",
+                                              key=f"{key}_{name}")
+        years = (first, last)
+        if first < last:
+            years = st.slider("Years", min_value=first, max_value=last, value=(first, last),
+                              key=f"{key}_years")
+
+    selected = {}
+    for name, (series_col, df, summary) in loaded.items():
+        index = indexes[name]
+        picked = chosen.get(name)
+        names = None
+        if picked and set(picked) < set(index.label_values(series_col)):
+            names = tuple(picked)
+        selection = (series_col, names, years if years != (first, last) else None)
+        series_years = index.year_range()
+        if series_years is not None:
+            series_years = (max(years[0], series_years[0]), min(years[1], series_years[1]))
+        if names is None and series_years == index.year_range():
+            selected[name] = df, summary, selection
+            continue
+        df, summary = profiled_load(f"select {name}", "selection", load_selection,
+                                    index.version, series_col, names, series_years,
+                                    _index=index)
+        if df.empty:
+            st.info(f"No {name.replace('_', ' ')} data in {years[0]}-{years[1]} for the "
+                    "selected series.")
+            return None
+        selected[name] = df, summary, selection
+    return selected
+
+# Year-over-year change, rolling volatility, drawdown and rank of every series,
+# computed once per data version
+@st.cache_resource(show_spinner=False, max_entries=16)
+def series_statistics_for(version, series_col, _df):
+    cache_counter("statistics").miss()
+    return series_statistics(_df, series_col)
+
+def load_statistics(df, series_col):
+    return profiled_load("statistics", "statistics", series_statistics_for, frame_version(df),
+                         series_col, _df=df)
+
+STATISTICS = {
+    '': "None",
+    'yoy': "Year-over-year change",
+    'volatility': "Rolling volatility",
+    'drawdown': "Drawdown from peak",
+    'rank': "Rank over time",
+}
+
+# Optional chart of one per-year statistic under a trend chart
+def statistic_chart(stats, statistic_figure, key):
+    statistic = st.radio("Trend statistic", list(STATISTICS), format_func=STATISTICS.get,
+                         key=key, horizontal=True)
+    if statistic:
+        show_chart(dashboard_figure(statistic_figure, stats, statistic, version=stats.version),
+                   statistic_figure.__name__)
+
+# Monthly/weekly view of a price series, for the series and years picked in
+# the sidebar (`selection`, see filtered_datasets). The date range acts as the
+# zoom window: only points inside it are sent, decimated to the point budget.
+def high_resolution_chart(name, resolution, timeseries_figure, key, selection):
+    label = f"load {name} {resolution}"
+    if manifest is not None:
+        df, _ = profiled_load(label, "precomputed", load_precomputed, name, artifacts_stamp,
+                              resolution, _manifest=manifest)
+    else:
+        df = profiled_load(label, "data", load_data, name, source_stamp(name),
+                           uses_streaming(name), resolution, _chunk_mb=int(chunk_mb))
+    if df['Date'].notna().sum() == 0:
+        st.info(f"This export has no {resolution} rows. Download the {resolution} "
+                "PRICE RECEIVED series from QuickStats to enable this view.")
+        return
+
+    series_col, names, years = selection
+    if names is not None or years is not None:
+        index = profiled_load(f"series index {name} {resolution}", "series index",
+                              load_series_index, frame_version(df), _df=df)
+        df = profiled_load(f"select {name} {resolution}", "selection", load_rows,
+                           index.version, series_col, names, years, _index=index)
+        if df['Date'].notna().sum() == 0:
+            st.info(f"No {resolution} rows for the selected series and years.")
+            return
+
+    first, last = df['Date'].min().date(), df['Date'].max().date()
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        window = st.slider("Date range", min_value=first, max_value=last,
+                           value=(first, last), key=f"{key}_window")
+    with col2:
+        point_budget = st.select_slider("Point budget", [500, 1000, 2000, 5000, 10000],
+                                        value=2000, key=f"{key}_budget")
+    with col3:
+        method = st.radio("Downsampling", ["LTTB", "Min/Max"], key=f"{key}_method",
+                          horizontal=True)
+
+    fig = dashboard_figure(timeseries_figure, df, resolution, window, point_budget,
+                           'lttb' if method == "LTTB" else 'minmax')
+    show_chart(fig, timeseries_figure.__name__)
+
+# Each page loads only its own dataset. Once per server process, after the
+# first page has rendered, the others are prefetched in the background (data,
+# summaries, series indexes and trend charts), so switching pages later
+# doesn't pay for parsing.
+WARM_UP = [
+    ('cropland', 'State', cropland_trend_figure),
+    ('crop_prices', 'Commodity', crop_price_trend_figure),
+    ('index_pricing', 'Commodity', index_trend_figure),
+]
+
+def warm_up():
+    for name, series_col, trend_figure in WARM_UP:
+        streaming, stamp = prefers_streaming(name), source_stamp(name)
+        cache_counter("summary").call(load_summary, name, stamp, series_col, streaming)
+        df, _ = cache_counter("data").call(load_data, name, stamp, streaming)
+        cache_counter("series index").call(load_series_index, frame_version(df), _df=df)
+        cached_figure(trend_figure, df)
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    thread = threading.Thread(target=warm_up, name="dashboard-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# Insight list items numbered in order, leaving out those that don't apply to
+# the current selection (None)
+def numbered(items):
+    return "\n\n".join(f"{number}. {item}"
+                       for number, item in enumerate((item for item in items if item), 1))
+
+# ================================
+# CROPLAND VALUE ANALYSIS
+# ================================
+
+# Each analysis section is a fragment: its widgets (e.g. the raw data
+# checkbox) rerun only that section instead of the whole page
+@st.fragment
+@profiled_section("Cropland section")
+def cropland_section(df_cropland, cropland_summary, cropland_stats):
+    if cropland_summary.empty:
+        st.info("No published values for the selected states and years.")
+        return
+
+    # Add description, for the states and years selected
+    states = [state.title() for state in cropland_summary.index]
+    state_list = (", ".join(states[:-1]) + ", and " + states[-1] if len(states) > 2
+                  else " and ".join(states))
+    first_year, last_year = df_cropland['Year'].min(), df_cropland['Year'].max()
+    period = f"from {first_year} to {last_year}" if first_year < last_year else f"in {last_year}"
+    st.write(f"""
 ## Cropland Value Analysis by State
 This analysis shows the agricultural land (cropland) asset values measured in dollars per acre 
-across four states: Indiana, Kentucky, Ohio, and Tennessee from 2013 to 2025.
+across {len(states)} state{'s' if len(states) != 1 else ''}: {state_list} {period}.
 """)
 
-# Create the main line chart
-st.header("📈 Cropland Value Trends by State (2013-2025)")
-
-# Create line plot with Plotly
-fig = go.Figure()
-
-# Get unique states and create a color palette
-states = df_cropland['State'].unique()
-colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']  # Blue, Orange, Green, Red
-
-# Create a comprehensive hover data structure
-years = sorted(df_cropland['Year'].unique())
-hover_info = {}
-
-# Pre-compute hover information for each year
-for year in years:
-    year_data = df_cropland[df_cropland['Year'] == year].copy()
-    year_data = year_data.sort_values('Value_Clean', ascending=False)
-    
-    hover_lines = [f"<b>Year: {year}</b>"]
-    for _, row in year_data.iterrows():
-        hover_lines.append(f"{row['State']}: ${row['Value_Clean']:,.0f}/acre")
-    
-    hover_info[year] = "<br>".join(hover_lines)
-
-# Add a line for each state with custom hover text
-for i, state in enumerate(states):
-    state_data = df_cropland[df_cropland['State'] == state].sort_values('Year')
-    
-    fig.add_trace(go.Scatter(
-        x=state_data['Year'],
-        y=state_data['Value_Clean'],
-        mode='lines+markers',
-        name=state,
-        line=dict(width=3, color=colors[i]),
-        marker=dict(size=8, color=colors[i]),
-        hovertemplate='<b>%{fullData.name}</b><br>' +
-                     'Year: %{x}<br>' +
-                     'Value: $%{y:,.0f}/acre<br>' +
-                     '<extra></extra>',
-        showlegend=True
-    ))
-
-# Update layout for better appearance
-fig.update_layout(
-    title={
-        'text': 'Cropland Asset Value by State (2013-2025)',
-        'x': 0.5,
-        'xanchor': 'center',
-        'font': {'size': 20}
-    },
-    xaxis_title='Year',
-    yaxis_title='Value ($ per Acre)',
-    xaxis=dict(
-        tickmode='linear',
-        tick0=2013,
-        dtick=1,
-        tickfont=dict(size=12),
-        title_font=dict(size=14)
-    ),
-    yaxis=dict(
-        tickformat='$,.0f',
-        tickfont=dict(size=12),
-        title_font=dict(size=14)
-    ),
-    legend=dict(
-        orientation="v",
-        yanchor="top",
-        y=1,
-        xanchor="left",
-        x=1.02,
-        font=dict(size=12),
-        itemclick="toggle",  # Enables hide/show functionality
-        itemdoubleclick="toggleothers"  # Double-click to show only that state
-    ),
-    width=800,
-    height=500,
-    hovermode='x',  # This gives the vertical line without the bottom summary
-    hoverlabel=dict(
-        bgcolor="white",
-        bordercolor="black",
-        font_size=12,
-        font_family="Arial"
-    ),
-    annotations=[
-        dict(
-            text="💡 Click legend to hide/show<br>Double-click to isolate",
-            xref="paper", yref="paper",
-            x=1.01, y=0.72,  # Adjusted position
-            xanchor="left", yanchor="top",
-            showarrow=False,
-            font=dict(size=9, color="gray"),
-            bgcolor="rgba(255,255,255,0.9)",
-            bordercolor="lightgray",
-            borderwidth=1
-        )
-    ]
-)
-
-st.plotly_chart(fig, use_container_width=True)
+    # Create the main line chart
+    st.header(f"📈 Cropland Value Trends by State ({year_span(df_cropland)})")
 
-# Display key statistics
-st.header("📊 Key Statistics")
+    # Create line plot with Plotly (one trace per state, hover shows each state's rank that year)
+    fig = dashboard_figure(cropland_trend_figure, df_cropland)
 
-col1, col2, col3, col4 = st.columns(4)
-
-for i, state in enumerate(states):
-    state_data = df_cropland[df_cropland['State'] == state]
-    latest_value = state_data[state_data['Year'] == state_data['Year'].max()]['Value_Clean'].iloc[0]
-    earliest_value = state_data[state_data['Year'] == state_data['Year'].min()]['Value_Clean'].iloc[0]
-    growth = ((latest_value - earliest_value) / earliest_value) * 100
-    
-    if i == 0:
-        with col1:
-            st.metric(
-                label=f"{state}",
-                value=f"${latest_value:,.0f}/acre",
-                delta=f"{growth:.1f}% since 2013"
-            )
-    elif i == 1:
-        with col2:
-            st.metric(
-                label=f"{state}",
-                value=f"${latest_value:,.0f}/acre",
-                delta=f"{growth:.1f}% since 2013"
-            )
-    elif i == 2:
-        with col3:
-            st.metric(
-                label=f"{state}",
-                value=f"${latest_value:,.0f}/acre",
-                delta=f"{growth:.1f}% since 2013"
-            )
-    elif i == 3:
-        with col4:
-            st.metric(
-                label=f"{state}",
-                value=f"${latest_value:,.0f}/acre",
-                delta=f"{growth:.1f}% since 2013"
-            )
+    show_chart(fig, "cropland_trend_figure")
 
-# Comparative analysis
-st.header("🔍 Comparative Analysis")
-
-# Bar chart for latest year comparison
-latest_year = df_cropland['Year'].max()
-latest_data = df_cropland[df_cropland['Year'] == latest_year]
-
-fig_bar = px.bar(
-    latest_data, 
-    x='State', 
-    y='Value_Clean',
-    color='State',
-    title=f'Cropland Values by State - {latest_year}',
-    labels={'Value_Clean': 'Value ($ per Acre)', 'State': 'State'},
-    color_discrete_sequence=colors
-)
+    statistic_chart(cropland_stats, cropland_statistic_figure, key="cropland_statistic")
 
-fig_bar.update_layout(
-    showlegend=False,
-    yaxis_tickformat='$,.0f',
-    title_x=0.5
-)
+    # Display key statistics
+    st.header("📊 Key Statistics")
 
-st.plotly_chart(fig_bar, use_container_width=True)
+    with profiler.span("metrics", "block"):
+        for col, stats in zip(st.columns(len(cropland_summary)), cropland_summary.itertuples()):
+            with col:
+                st.metric(
+                    label=f"{stats.Index}",
+                    value=f"${stats.latest_value:,.0f}/acre",
+                    delta=f"{stats.growth_pct:.1f}% since {stats.earliest_year}"
+                )
 
-# Data table
-st.header("📋 Raw Data")
-if st.checkbox("Show Cropland Value Data"):
-    # Display only relevant columns
-    display_df = df_cropland[['Year', 'State', 'Value']].sort_values(['Year', 'State'])
-    st.dataframe(display_df, use_container_width=True)
+    # Comparative analysis
+    st.header("🔍 Comparative Analysis")
 
-# Additional insights
-st.header("💡 Key Insights")
-st.write(f"""
-**Observations from the Cropland Value Data:**
+    # Bar chart for latest year comparison
+    latest_year, latest_data = latest_year_rows(cropland_summary)
 
-1. **Highest Values**: Ohio consistently shows the highest cropland values, reaching ${df_cropland[df_cropland['State'] == 'OHIO']['Value_Clean'].max():,.0f}/acre in {latest_year}.
+    fig_bar = dashboard_figure(cropland_latest_bar, latest_data, latest_year)
 
-2. **Growth Trends**: All states show general upward trends in cropland values over the period from 2013 to {latest_year}.
+    show_chart(fig_bar, "cropland_latest_bar")
 
-3. **State Rankings** (as of {latest_year}):
-   - 1st: Ohio (${latest_data[latest_data['State'] == 'OHIO']['Value_Clean'].iloc[0]:,.0f}/acre)
-   - 2nd: Indiana (${latest_data[latest_data['State'] == 'INDIANA']['Value_Clean'].iloc[0]:,.0f}/acre)
-   - 3rd: Kentucky (${latest_data[latest_data['State'] == 'KENTUCKY']['Value_Clean'].iloc[0]:,.0f}/acre)
-   - 4th: Tennessee (${latest_data[latest_data['State'] == 'TENNESSEE']['Value_Clean'].iloc[0]:,.0f}/acre)
+    # Data table
+    st.header("📋 Raw Data")
+    if st.checkbox("Show Cropland Value Data"):
+        # Display only relevant columns, one page at a time
+        with profiler.span("raw data", "block"):
+            data_viewer(df_cropland, ['Year', 'State', 'Value'], sort_by=['Year', 'State'],
+                        filter_col='State', key="cropland_data")
 
-4. **Market Dynamics**: The data reflects agricultural land appreciation trends across the Midwest and Southeast regions.
-""")
+    # Additional insights
+    st.header("💡 Key Insights")
+    with profiler.span("insights", "block"):
+        cropland_ranking = list(cropland_summary.sort_values('rank').itertuples())
+        cropland_leader = cropland_ranking[0]
+        ranking_lines = "\n".join(
+            f"   - {ordinal(stats.rank)}: {stats.Index.title()} (${stats.latest_value:,.0f}/acre)"
+            for stats in cropland_ranking
+        )
+        trends = cropland_stats.table()
+        most_first = trends.sort_values('years_ranked_first', ascending=False).iloc[0]
+        first_year = cropland_summary['earliest_year'].min()
+        by_growth = trends['cagr_pct'].dropna().sort_values()
+        growing = (by_growth > 0).sum()
+        growth_text = ("All states grew" if growing == len(by_growth)
+                       else f"{growing} of {len(by_growth)} states grew")
+        deepest = trends.sort_values('max_drawdown_pct').iloc[0]
+        by_volatility = trends['volatility_pct'].dropna().sort_values()
+
+        highest = (f"**Highest Values**: {cropland_leader.Index.title()} shows the highest "
+                   f"cropland value today, having reached ${cropland_leader.max_value:,.0f}/acre "
+                   f"in {cropland_leader.max_year}.")
+        if most_first.years_ranked:
+            highest += (f" {most_first.name.title()} ranked 1st in "
+                        f"{most_first.years_ranked_first:.0f} of {most_first.years_ranked:.0f} "
+                        "years.")
+        growth = None
+        if latest_year > first_year and len(by_growth) == 1:
+            growth = (f"**Growth Trends**: Between {first_year} and {latest_year} "
+                      f"{by_growth.index[0].title()} grew at a compound annual rate of "
+                      f"{by_growth.iloc[0]:.1f}%.")
+        elif latest_year > first_year and len(by_growth):
+            growth = (f"**Growth Trends**: {growth_text} between {first_year} and {latest_year}, "
+                      f"at compound annual rates from {by_growth.iloc[0]:.1f}% "
+                      f"({by_growth.index[0].title()}) to {by_growth.iloc[-1]:.1f}% "
+                      f"({by_growth.index[-1].title()}).")
+        setbacks = []
+        if deepest.max_drawdown_pct < 0:
+            setbacks.append(f"The deepest decline was {deepest.name.title()}'s "
+                            f"{-deepest.max_drawdown_pct:.1f}% fall from its "
+                            f"{deepest.drawdown_peak_year:.0f} peak to "
+                            f"{deepest.drawdown_trough_year:.0f}.")
+        if len(by_volatility) > 1:
+            setbacks.append(f"Year-over-year changes were steadiest in "
+                            f"{by_volatility.index[0].title()} (volatility "
+                            f"{by_volatility.iloc[0]:.1f}%) and most variable in "
+                            f"{by_volatility.index[-1].title()} ({by_volatility.iloc[-1]:.1f}%).")
+        st.write("**Observations from the Cropland Value Data:**\n\n" + numbered([
+            highest,
+            growth,
+            f"**State Rankings** (as of {latest_year}):\n{ranking_lines}",
+            setbacks and "**Setbacks**: " + " ".join(setbacks),
+        ]))
+
+def cropland_page():
+    loaded = {'cropland': ('State', *load_with_progress('cropland', 'State', "cropland values"))}
+    selected = filtered_datasets(loaded, key="cropland_filter")
+    if selected is not None:
+        df, summary, _ = selected['cropland']
+        cropland_section(df, summary, load_statistics(df, 'State'))
 
 # ================================
 # CROP PRICES ANALYSIS
 # ================================
 
-st.markdown("---")  # Divider
-st.title("🌾 Crop Prices Analysis")
+@st.fragment
+@profiled_section("Crop prices section")
+def crop_prices_section(df_crop_prices, crop_prices_summary, crop_prices_stats, selection):
+    st.title("🌾 Crop Prices Analysis")
 
-st.write("""
+    st.write("""
 ## National Crop Prices by Commodity
 This analysis shows the price trends for major agricultural commodities (Corn, Soybeans, and Wheat) 
 across marketing years, measured in dollars per bushel.
 """)
 
-# Create the crop prices line chart
-st.header("📈 Crop Price Trends by Commodity")
-
-# Create line plot for crop prices
-fig_crops = go.Figure()
-
-# Get unique commodities and create a color palette
-commodities = df_crop_prices['Commodity'].unique()
-crop_colors = ['#FF6B6B', '#4ECDC4', '#45B7D1']  # Red, Teal, Blue
-
-# Add a line for each commodity
-for i, commodity in enumerate(commodities):
-    commodity_data = df_crop_prices[df_crop_prices['Commodity'] == commodity].sort_values('Year')
-    
-    fig_crops.add_trace(go.Scatter(
-        x=commodity_data['Year'],
-        y=commodity_data['Value_Clean'],
-        mode='lines+markers',
-        name=commodity.title(),
-        line=dict(width=3, color=crop_colors[i]),
-        marker=dict(size=8, color=crop_colors[i]),
-        hovertemplate='<b>%{fullData.name}</b><br>' +
-                     'Year: %{x}<br>' +
-                     'Price: $%{y:.2f}/bushel<br>' +
-                     '<extra></extra>',
-        showlegend=True
-    ))
-
-# Update layout for crop prices chart
-fig_crops.update_layout(
-    title={
-        'text': 'Crop Prices by Commodity (Marketing Years)',
-        'x': 0.5,
-        'xanchor': 'center',
-        'font': {'size': 20}
-    },
-    xaxis_title='Marketing Year',
-    yaxis_title='Price ($ per Bushel)',
-    xaxis=dict(
-        tickmode='linear',
-        tick0=df_crop_prices['Year'].min(),
-        dtick=1,
-        tickfont=dict(size=12),
-        title_font=dict(size=14)
-    ),
-    yaxis=dict(
-        tickformat='$,.2f',
-        tickfont=dict(size=12),
-        title_font=dict(size=14)
-    ),
-    legend=dict(
-        orientation="v",
-        yanchor="top",
-        y=1,
-        xanchor="left",
-        x=1.02,
-        font=dict(size=12),
-        itemclick="toggle",  # Enables hide/show functionality
-        itemdoubleclick="toggleothers"  # Double-click to show only that commodity
-    ),
-    width=800,
-    height=500,
-    hovermode='x',  # This gives the vertical line without summaries
-    hoverlabel=dict(
-        bgcolor="white",
-        bordercolor="black",
-        font_size=12,
-        font_family="Arial"
-    ),
-    annotations=[
-        dict(
-            text="💡 Click legend to hide/show<br>Double-click to isolate",
-            xref="paper", yref="paper",
-            x=1.01, y=0.72,  # Adjusted position to prevent cutoff
-            xanchor="left", yanchor="top",
-            showarrow=False,
-            font=dict(size=9, color="gray"),
-            bgcolor="rgba(255,255,255,0.9)",
-            bordercolor="lightgray",
-            borderwidth=1
+    # Create the crop prices line chart
+    st.header("📈 Crop Price Trends by Commodity")
+
+    resolution = st.radio("Resolution", ["Annual", "Monthly", "Weekly"],
+                          key="crop_prices_resolution", horizontal=True)
+
+    if resolution == "Annual":
+        # Create line plot for crop prices
+        fig_crops = dashboard_figure(crop_price_trend_figure, df_crop_prices)
+
+        show_chart(fig_crops, "crop_price_trend_figure")
+
+        statistic_chart(crop_prices_stats, crop_price_statistic_figure,
+                        key="crop_prices_statistic")
+    else:
+        high_resolution_chart('crop_prices', resolution.lower(), crop_price_timeseries_figure,
+                              key="crop_prices", selection=selection)
+
+    # Display crop price statistics
+    st.header("📊 Crop Price Statistics")
+
+    if crop_prices_summary.empty:
+        st.info("No published prices for the selected crops and years.")
+        return
+
+    with profiler.span("metrics", "block"):
+        columns = st.columns(len(crop_prices_summary))
+        for col, stats in zip(columns, crop_prices_summary.itertuples()):
+            with col:
+                st.metric(
+                    label=f"{stats.Index.title()}",
+                    value=f"${stats.latest_value:.2f}/bu",
+                    delta=f"{stats.growth_pct:.1f}% since {stats.earliest_year}"
+                )
+
+    # Comparative analysis for crop prices
+    st.header("🔍 Crop Price Comparison")
+
+    # Bar chart for latest year comparison
+    latest_crop_year, latest_crop_data = latest_year_rows(crop_prices_summary)
+
+    fig_crop_bar = dashboard_figure(crop_price_latest_bar, latest_crop_data, latest_crop_year)
+
+    show_chart(fig_crop_bar, "crop_price_latest_bar")
+
+    # Crop prices data table
+    st.header("📋 Crop Prices Raw Data")
+    if st.checkbox("Show Crop Prices Data"):
+        # Display only relevant columns, one page at a time
+        with profiler.span("raw data", "block"):
+            data_viewer(df_crop_prices, ['Year', 'Commodity', 'Value'],
+                        sort_by=['Year', 'Commodity'], filter_col='Commodity',
+                        key="crop_prices_data")
+
+    # Additional insights for crop prices
+    st.header("💡 Crop Price Insights")
+    with profiler.span("insights", "block"):
+        crop_ranking = crop_prices_summary.sort_values('rank')
+        crop_names = [commodity.title() for commodity in crop_ranking.index]
+        trends = crop_prices_stats.table()
+        first_year = crop_prices_summary['earliest_year'].min()
+
+        def current_price(stats):
+            trend = trends.loc[stats.Index]
+            changes = []
+            if not math.isnan(trend.latest_yoy_pct):
+                changes.append(f"{trend.latest_yoy_pct:+.1f}% on the previous year")
+            if trend.current_drawdown_pct < 0:
+                changes.append(f"{-trend.current_drawdown_pct:.1f}% below its "
+                               f"{trend.peak_year:.0f} peak")
+            else:
+                changes.append(f"at its {trend.peak_year:.0f} peak")
+            return (f"   - {stats.Index.title()}: ${stats.latest_value:.2f}/bushel "
+                    f"({', '.join(changes)})")
+
+        current_price_lines = "\n".join(
+            current_price(stats) for stats in crop_prices_summary.itertuples()
         )
-    ]
-)
+        by_volatility = trends.dropna(subset=['volatility_pct']).sort_values('volatility_pct')
+        by_recent_volatility = trends['recent_volatility_pct'].dropna().sort_values()
+        by_growth = trends['cagr_pct'].dropna().sort_values()
+
+        volatility = None
+        if len(by_volatility):
+            most_volatile = by_volatility.iloc[-1]
+            volatility = (f"**Price Volatility**: {most_volatile.name.title()} shows the highest "
+                          f"price volatility, with year-over-year swings of "
+                          f"{most_volatile.volatility_pct:.1f}% (standard deviation of yearly log "
+                          f"changes) and a peak in {most_volatile.peak_year:.0f}.")
+            if len(by_recent_volatility):
+                volatility += (f" Over the last {ROLLING_WINDOW} years "
+                               f"{by_recent_volatility.index[-1].title()} has been the most "
+                               f"volatile ({by_recent_volatility.iloc[-1]:.1f}%).")
+        market = None
+        if latest_crop_year > first_year and len(by_growth) == 1:
+            market = (f"**Market Trends**: Since {first_year}, {by_growth.index[0].title()} "
+                      f"prices grew at a compound annual rate of {by_growth.iloc[0]:.1f}%.")
+        elif latest_crop_year > first_year and len(by_growth):
+            market = (f"**Market Trends**: Since {first_year}, prices grew at compound annual "
+                      f"rates from {by_growth.iloc[0]:.1f}% ({by_growth.index[0].title()}) to "
+                      f"{by_growth.iloc[-1]:.1f}% ({by_growth.index[-1].title()}).")
+        rankings = None
+        if len(crop_names) > 1:
+            rankings = (f"**Price Rankings**: {crop_names[0]} commands the highest price per "
+                        f"bushel, followed by {' and '.join(crop_names[1:])}.")
+        st.write("**Observations from the Crop Prices Data:**\n\n" + numbered([
+            volatility,
+            f"**Current Prices** (Marketing Year {latest_crop_year}):\n{current_price_lines}",
+            market,
+            rankings,
+        ]))
+
+def crop_prices_page():
+    loaded = {
+        'crop_prices': ('Commodity', *load_with_progress('crop_prices', 'Commodity', "crop prices"))
+    }
+    selected = filtered_datasets(loaded, key="crop_prices_filter")
+    if selected is not None:
+        df, summary, selection = selected['crop_prices']
+        crop_prices_section(df, summary, load_statistics(df, 'Commodity'), selection)
 
-st.plotly_chart(fig_crops, use_container_width=True)
+# ================================
+# INDEX PRICING ANALYSIS
+# ================================
+
+@st.fragment
+@profiled_section("Price index section")
+def index_pricing_section(df_index_pricing, index_summary, index_stats_by_year, selection):
+    st.title("📊 Food Commodities Price Index Analysis")
+
+    st.write(f"""
+## Food Commodities Price Index (Base Year: {INDEX_BASE_YEAR})
+This analysis shows the annual Food Commodities Price Index, which tracks the overall price trends 
+for food commodities with {INDEX_BASE_YEAR} as the base year (index = 100).
+""")
 
-# Display crop price statistics
-st.header("📊 Crop Price Statistics")
+    # Create the index pricing line chart
+    st.header("📈 Food Commodities Price Index Trend")
 
-col1, col2, col3 = st.columns(3)
+    resolution = st.radio("Resolution", ["Annual", "Monthly", "Weekly"],
+                          key="index_pricing_resolution", horizontal=True)
+
+    if resolution == "Annual":
+        # Create single line plot for index pricing, with the base year reference line
+        fig_index = dashboard_figure(index_trend_figure, df_index_pricing)
+
+        show_chart(fig_index, "index_trend_figure")
+
+        statistic_chart(index_stats_by_year, index_statistic_figure,
+                        key="index_pricing_statistic")
+    else:
+        high_resolution_chart('index_pricing', resolution.lower(), index_timeseries_figure,
+                              key="index_pricing", selection=selection)
+
+    # Display index pricing statistics
+    st.header("📊 Index Statistics")
+
+    if index_summary.empty:
+        st.info("No published index values for the selected years.")
+        return
+
+    # Key statistics come from the precomputed series summary
+    index_stats = next(index_summary.itertuples())
+    current_index = index_stats.latest_value
+    base_year = INDEX_BASE_YEAR
+    current_year = index_stats.latest_year
+    max_index = index_stats.max_value
+    min_index = index_stats.min_value
+    max_year = index_stats.max_year
+    min_year = index_stats.min_year
+
+    with profiler.span("metrics", "block"):
+        col1, col2, col3, col4 = st.columns(4)
 
-for i, commodity in enumerate(commodities):
-    commodity_data = df_crop_prices[df_crop_prices['Commodity'] == commodity]
-    latest_price = commodity_data[commodity_data['Year'] == commodity_data['Year'].max()]['Value_Clean'].iloc[0]
-    earliest_price = commodity_data[commodity_data['Year'] == commodity_data['Year'].min()]['Value_Clean'].iloc[0]
-    price_change = ((latest_price - earliest_price) / earliest_price) * 100
-    
-    if i == 0:
         with col1:
             st.metric(
-                label=f"{commodity.title()}",
-                value=f"${latest_price:.2f}/bu",
-                delta=f"{price_change:.1f}% since {commodity_data['Year'].min()}"
+                label=f"Current Index ({current_year})",
+                value=f"{current_index:.1f}",
+                delta=f"{current_index - 100:.1f} from base year"
             )
-    elif i == 1:
+
         with col2:
             st.metric(
-                label=f"{commodity.title()}",
-                value=f"${latest_price:.2f}/bu",
-                delta=f"{price_change:.1f}% since {commodity_data['Year'].min()}"
+                label="Highest Index",
+                value=f"{max_index:.1f}",
+                delta=f"in {max_year}"
             )
-    elif i == 2:
+
         with col3:
             st.metric(
-                label=f"{commodity.title()}",
-                value=f"${latest_price:.2f}/bu",
-                delta=f"{price_change:.1f}% since {commodity_data['Year'].min()}"
+                label="Lowest Index",
+                value=f"{min_index:.1f}",
+                delta=f"in {min_year}"
             )
 
-# Comparative analysis for crop prices
-st.header("🔍 Crop Price Comparison")
-
-# Bar chart for latest year comparison
-latest_crop_year = df_crop_prices['Year'].max()
-latest_crop_data = df_crop_prices[df_crop_prices['Year'] == latest_crop_year]
-
-fig_crop_bar = px.bar(
-    latest_crop_data, 
-    x='Commodity', 
-    y='Value_Clean',
-    color='Commodity',
-    title=f'Crop Prices by Commodity - {latest_crop_year} Marketing Year',
-    labels={'Value_Clean': 'Price ($ per Bushel)', 'Commodity': 'Commodity'},
-    color_discrete_sequence=crop_colors
-)
-
-fig_crop_bar.update_layout(
-    showlegend=False,
-    yaxis_tickformat='$,.2f',
-    title_x=0.5
-)
-
-# Update x-axis labels to be more readable
-fig_crop_bar.update_xaxes(ticktext=[c.title() for c in latest_crop_data['Commodity']], 
-                         tickvals=latest_crop_data['Commodity'])
+        with col4:
+            percent_change = ((current_index - 100) / 100) * 100
+            st.metric(
+                label="Total Change",
+                value=f"{percent_change:+.1f}%",
+                delta=f"since {base_year}"
+            )
 
-st.plotly_chart(fig_crop_bar, use_container_width=True)
+    # Index pricing data table
+    st.header("📋 Index Pricing Raw Data")
+    if st.checkbox("Show Index Pricing Data"):
+        # Display only relevant columns, one page at a time
+        with profiler.span("raw data", "block"):
+            data_viewer(df_index_pricing, ['Year', 'Value'], sort_by=['Year'],
+                        labels={'Value': 'Price Index'}, key="index_pricing_data")
+
+    # Additional insights for index pricing
+    st.header("💡 Price Index Insights")
+    with profiler.span("insights", "block"):
+        index_trend = index_stats_by_year.table().iloc[0]
+        trend_claims = []
+        if not math.isnan(index_trend.cagr_pct):
+            trend_claims.append(f"Since {index_stats.earliest_year} the index has grown "
+                                f"{index_trend.cagr_pct:.1f}% a year (compound)")
+        if not math.isnan(index_trend.volatility_pct):
+            trend_claims.append(f"year-over-year swings were {index_trend.volatility_pct:.1f}% "
+                                "(volatility)")
+        if index_trend.max_drawdown_pct < 0:
+            trend_claims.append(f"its deepest fall was {-index_trend.max_drawdown_pct:.1f}% from "
+                                f"the {index_trend.drawdown_peak_year:.0f} peak to "
+                                f"{index_trend.drawdown_trough_year:.0f}")
+        if index_trend.current_drawdown_pct < 0:
+            trend_claims.append(f"it is {-index_trend.current_drawdown_pct:.1f}% below its "
+                                f"{index_trend.peak_year:.0f} high")
+        long_term_trend = ("; ".join(trend_claims) + "." if trend_claims else
+                           "The selected years are too few to show a trend.")
+        long_term_trend = long_term_trend[0].upper() + long_term_trend[1:]
+        st.write(f"""
+**Observations from the Food Commodities Price Index:**
 
-# Crop prices data table
-st.header("📋 Crop Prices Raw Data")
-if st.checkbox("Show Crop Prices Data"):
-    # Display only relevant columns
-    display_crop_df = df_crop_prices[['Year', 'Commodity', 'Value']].sort_values(['Year', 'Commodity'])
-    st.dataframe(display_crop_df, use_container_width=True)
+1. **Base Year Reference**: The index uses {base_year} as the base year (index = 100), making it easy to compare relative price changes.
 
-# Additional insights for crop prices
-st.header("💡 Crop Price Insights")
-st.write(f"""
-**Observations from the Crop Prices Data:**
+2. **Peak Performance**: The highest index value was {max_index:.1f} in {max_year}, representing a {((max_index - 100) / 100) * 100:.1f}% increase from the base year.
 
-1. **Price Volatility**: {commodities[1].title()} shows the highest price volatility, reaching peaks during certain marketing years.
+3. **Lowest Point**: The index reached its minimum of {min_index:.1f} in {min_year}, representing a {((min_index - 100) / 100) * 100:.1f}% change from the base year.
 
-2. **Current Prices** (Marketing Year {latest_crop_year}):
-   - {commodities[0].title()}: ${latest_crop_data[latest_crop_data['Commodity'] == commodities[0]]['Value_Clean'].iloc[0]:.2f}/bushel
-   - {commodities[1].title()}: ${latest_crop_data[latest_crop_data['Commodity'] == commodities[1]]['Value_Clean'].iloc[0]:.2f}/bushel
-   - {commodities[2].title()}: ${latest_crop_data[latest_crop_data['Commodity'] == commodities[2]]['Value_Clean'].iloc[0]:.2f}/bushel
+4. **Current Status**: As of {current_year}, the index stands at {current_index:.1f}, indicating that food commodity prices are {percent_change:+.1f}% {'higher' if percent_change > 0 else 'lower'} than the {base_year} baseline.
 
-3. **Market Trends**: The data reflects global commodity market dynamics, weather impacts, and supply/demand fluctuations.
+5. **Long-term Trend**: {long_term_trend}
 
-4. **Price Rankings**: {commodities[1].title()} typically commands the highest price per bushel, followed by {commodities[2].title()} and {commodities[0].title()}.
+6. **Market Context**: Values above 100 indicate prices higher than {base_year} levels, while values below 100 indicate prices lower than the base year.
 """)
 
+def index_pricing_page():
+    loaded = {
+        'index_pricing': ('Commodity', *load_with_progress('index_pricing', 'Commodity',
+                                                           "price index"))
+    }
+    selected = filtered_datasets(loaded, key="index_pricing_filter")
+    if selected is not None:
+        df, summary, selection = selected['index_pricing']
+        index_pricing_section(df, summary, load_statistics(df, 'Commodity'), selection)
+
 # ================================
-# INDEX PRICING ANALYSIS
+# CROSS-DATASET ANALYSIS
 # ================================
 
-st.markdown("---")  # Divider
-st.title("📊 Food Commodities Price Index Analysis")
-
-st.write("""
-## Food Commodities Price Index (Base Year: 2011)
-This analysis shows the annual Food Commodities Price Index, which tracks the overall price trends 
-for food commodities with 2011 as the base year (index = 100).
+# Every series aligned on one year axis, plus the land-to-crop price ratios
+# drawn on this page, computed once per combination of dataset versions
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_cross_dataset(versions, _frames):
+    cache_counter("analytics").miss()
+    panel = align(_frames)
+    land_crop_ratio = ratio(panel.block('cropland'), panel.block('crop_prices'))
+    return panel, land_crop_ratio
+
+@st.fragment
+@profiled_section("Cross-dataset section")
+def cross_dataset_section(panel, land_crop_ratio):
+    st.title("🔗 Cross-Dataset Analysis")
+
+    st.write(f"""
+## Real Prices and Land-to-Crop Price Ratios
+This analysis combines the three datasets on a shared year axis (marketing years are aligned with the
+year they start in): crop prices deflated by the Food Commodities Price Index, and cropland values
+expressed in bushels of each crop.
 """)
 
-# Create the index pricing line chart
-st.header("📈 Food Commodities Price Index Trend")
-
-# Sort data by year for proper line plotting
-index_data_sorted = df_index_pricing.sort_values('Year')
-
-# Create single line plot for index pricing
-fig_index = go.Figure()
-
-fig_index.add_trace(go.Scatter(
-    x=index_data_sorted['Year'],
-    y=index_data_sorted['Value_Clean'],
-    mode='lines+markers',
-    name='Food Commodities Price Index',
-    line=dict(width=4, color='#8B4513'),  # Brown color for food commodities
-    marker=dict(size=10, color='#8B4513'),
-    hovertemplate='<b>Food Commodities Price Index</b><br>' +
-                 'Year: %{x}<br>' +
-                 'Index Value: %{y:.1f}<br>' +
-                 '(Base Year 2011 = 100)<br>' +
-                 '<extra></extra>'
-))
-
-# Update layout for index pricing chart
-fig_index.update_layout(
-    title={
-        'text': 'Food Commodities Price Index (Annual, Base Year 2011 = 100)',
-        'x': 0.5,
-        'xanchor': 'center',
-        'font': {'size': 20}
-    },
-    xaxis_title='Year',
-    yaxis_title='Price Index (Base Year 2011 = 100)',
-    xaxis=dict(
-        tickmode='linear',
-        tick0=df_index_pricing['Year'].min(),
-        dtick=2,  # Show every 2 years for better readability
-        tickfont=dict(size=12),
-        title_font=dict(size=14)
-    ),
-    yaxis=dict(
-        tickformat='.1f',
-        tickfont=dict(size=12),
-        title_font=dict(size=14)
-    ),
-    showlegend=False,  # Single line doesn't need legend
-    width=800,
-    height=500,
-    hovermode='x'
-)
-
-# Add a horizontal line at 100 to show the base year
-fig_index.add_hline(y=100, line_dash="dash", line_color="gray", 
-                   annotation_text="Base Year (2011) = 100", 
-                   annotation_position="bottom right")
-
-st.plotly_chart(fig_index, use_container_width=True)
-
-# Display index pricing statistics
-st.header("📊 Index Statistics")
-
-# Calculate key statistics
-current_index = index_data_sorted['Value_Clean'].iloc[-1]
-base_year = 2011
-current_year = index_data_sorted['Year'].iloc[-1]
-max_index = index_data_sorted['Value_Clean'].max()
-min_index = index_data_sorted['Value_Clean'].min()
-max_year = index_data_sorted[index_data_sorted['Value_Clean'] == max_index]['Year'].iloc[0]
-min_year = index_data_sorted[index_data_sorted['Value_Clean'] == min_index]['Year'].iloc[0]
-
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.metric(
-        label=f"Current Index ({current_year})",
-        value=f"{current_index:.1f}",
-        delta=f"{current_index - 100:.1f} from base year"
-    )
-
-with col2:
-    st.metric(
-        label="Highest Index",
-        value=f"{max_index:.1f}",
-        delta=f"in {max_year}"
-    )
-
-with col3:
-    st.metric(
-        label="Lowest Index",
-        value=f"{min_index:.1f}",
-        delta=f"in {min_year}"
-    )
-
-with col4:
-    percent_change = ((current_index - 100) / 100) * 100
-    st.metric(
-        label="Total Change",
-        value=f"{percent_change:+.1f}%",
-        delta=f"since {base_year}"
-    )
-
-# Index pricing data table
-st.header("📋 Index Pricing Raw Data")
-if st.checkbox("Show Index Pricing Data"):
-    # Display only relevant columns
-    display_index_df = df_index_pricing[['Year', 'Value']].sort_values('Year')
-    display_index_df.columns = ['Year', 'Price Index']
-    st.dataframe(display_index_df, use_container_width=True)
-
-# Additional insights for index pricing
-st.header("💡 Price Index Insights")
-st.write(f"""
-**Observations from the Food Commodities Price Index:**
+    # Real prices, deflated by the index series picked when the export has several
+    st.header(f"💵 Real Crop Prices ({INDEX_BASE_YEAR} Dollars)")
+
+    index_names = list(panel.blocks['index_pricing'][2])
+    real_lines = None
+    if not index_names:
+        st.warning("No price index values for the selected years, so real prices can't be "
+                   "computed.")
+    else:
+        # The INDEX_BASE_YEAR index by default, as the prices are stated in its dollars
+        based = [name for name in index_names if str(INDEX_BASE_YEAR) in name]
+        index_series = (based or index_names)[0]
+        if len(index_names) > 1:
+            index_series = st.selectbox("Deflate by", index_names,
+                                        index=index_names.index(index_series),
+                                        format_func=str.title, key="real_price_index")
+        real_prices = deflate(panel.block('crop_prices'),
+                              panel.block('index_pricing', [index_series]))
+
+        show_chart(dashboard_figure(real_crop_price_figure, real_prices,
+                                    version=real_prices.version), "real_crop_price_figure")
+
+        real_endpoints = real_prices.endpoints()
+        # Nominal change over the same years as the real one
+        nominal_endpoints = panel.block('crop_prices').where(real_prices.mask).endpoints()
+        with profiler.span("metrics", "block"):
+            columns = st.columns(max(len(real_endpoints), 1))
+            for col, stats in zip(columns, real_endpoints.itertuples()):
+                with col:
+                    st.metric(
+                        label=f"{stats.Index.title()} ({stats.latest_year})",
+                        value=f"${stats.latest_value:.2f}/bu",
+                        delta=f"{stats.change_pct:.1f}% real since {stats.earliest_year}"
+                    )
+        real_lines = "\n".join(
+            f"   - {name.title()}: {nominal_endpoints.loc[name, 'change_pct']:+.1f}% nominal, "
+            f"{stats.change_pct:+.1f}% real ({stats.earliest_year}-{stats.latest_year})"
+            for name, stats in zip(real_endpoints.index, real_endpoints.itertuples())
+        )
 
-1. **Base Year Reference**: The index uses 2011 as the base year (index = 100), making it easy to compare relative price changes.
+    # Land-to-crop price ratio
+    st.header("🌽 Land-to-Crop Price Ratio")
+
+    commodities = list(panel.blocks['crop_prices'][2])
+    commodity = st.selectbox("Crop", commodities, format_func=str.title, key="ratio_commodity")
+
+    show_chart(dashboard_figure(land_crop_ratio_figure, land_crop_ratio, commodity,
+                                version=land_crop_ratio.version),
+               "land_crop_ratio_figure")
+
+    ratio_endpoints = land_crop_ratio.endpoints()
+    ratio_endpoints = ratio_endpoints[ratio_endpoints.index.str.endswith(f" / {commodity}")]
+    ratio_endpoints.index = ratio_endpoints.index.str.split(" / ").str[0]
+    with profiler.span("metrics", "block"):
+        columns = st.columns(max(len(ratio_endpoints), 1))
+        for col, stats in zip(columns, ratio_endpoints.itertuples()):
+            with col:
+                st.metric(
+                    label=f"{stats.Index.title()} ({stats.latest_year})",
+                    value=f"{stats.latest_value:,.0f} bu/acre",
+                    delta=f"{stats.change_pct:.1f}% since {stats.earliest_year}"
+                )
+
+    st.header("💡 Cross-Dataset Insights")
+    with profiler.span("insights", "block"):
+        ratio_lines = "\n".join(
+            f"   - {stats.Index.title()}: {stats.earliest_value:,.0f} bu/acre in "
+            f"{stats.earliest_year}, {stats.latest_value:,.0f} bu/acre in {stats.latest_year}"
+            for stats in ratio_endpoints.sort_values('latest_value', ascending=False).itertuples()
+        )
+        st.write("**Observations from the Combined Data:**\n\n" + numbered([
+            real_lines and f"**Real vs. Nominal Prices** (deflated to {INDEX_BASE_YEAR} by the "
+                           f"Food Commodities Price Index):\n{real_lines}",
+            f"**Cropland Value in Bushels of {commodity.title()}**:\n{ratio_lines}",
+            f"**Reading the Ratio**: A rising ratio means cropland has appreciated faster than "
+            f"{commodity.lower()} prices, so an acre takes more bushels of crop to pay for.",
+        ]))
+
+CROSS_DATASETS = [
+    ('cropland', 'State', "cropland values"),
+    ('crop_prices', 'Commodity', "crop prices"),
+    ('index_pricing', 'Commodity', "price index"),
+]
+
+def cross_dataset_page():
+    loaded = {
+        name: (series_col, *load_with_progress(name, series_col, label))
+        for name, series_col, label in CROSS_DATASETS
+    }
+    selected = filtered_datasets(loaded, key="cross_dataset_filter")
+    if selected is None:
+        return
+    frames = {name: (selected[name][0], series_col) for name, series_col, _ in CROSS_DATASETS}
+    versions = tuple(frame_version(df) for df, _ in frames.values())
+    cross_dataset_section(*profiled_load("cross-dataset series", "analytics", load_cross_dataset,
+                                         versions, _frames=frames))
 
-2. **Peak Performance**: The highest index value was {max_index:.1f} in {max_year}, representing a {((max_index - 100) / 100) * 100:.1f}% increase from the base year.
+# ================================
+# SQL QUERY
+# ================================
 
-3. **Lowest Point**: The index reached its minimum of {min_index:.1f} in {min_year}, representing a {((min_index - 100) / 100) * 100:.1f}% change from the base year.
+SQL_EXAMPLE = """-- Cropland value since 2013 in states where it grew more than 80%
+WITH growth AS (
+    SELECT State,
+           max(Value_Clean) FILTER (WHERE Year = (SELECT max(Year) FROM cropland))
+               / max(Value_Clean) FILTER (WHERE Year = 2013) - 1 AS growth
+    FROM cropland
+    GROUP BY State
+)
+SELECT Year, State, Value_Clean AS value, round(growth * 100, 1) AS growth_pct
+FROM cropland JOIN growth USING (State)
+WHERE growth > 0.8 AND Year >= 2013
+ORDER BY State, Year"""
+
+def is_numeric_field(field):
+    return (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+            or pa.types.is_decimal(field.type))
+
+# Ad hoc queries over the loaded datasets. Edits to the statement take effect
+# when the form is submitted; results are cached per SQL text and data
+# version, so reruns and other sessions asking the same question get them
+# for free.
+@st.fragment
+@profiled_section("SQL section")
+def sql_section(tables):
+    st.title("🧮 SQL Query")
+
+    st.write("""
+## Ad Hoc Analysis
+Query the datasets with SQL (DuckDB dialect). Each dataset is a table; `Value_Clean` holds the parsed
+values and `Suppressed` the code of any withheld value. Results are limited in rows and run time.
+""")
 
-4. **Current Status**: As of {current_year}, the index stands at {current_index:.1f}, indicating that food commodity prices are {percent_change:+.1f}% {'higher' if percent_change > 0 else 'lower'} than the 2011 baseline.
+    with st.expander("📚 Tables"):
+        for name, df in tables.items():
+            st.markdown(f"**{name}** ({len(df):,} rows): "
+                        + ", ".join(f"`{column}`" for column in df.columns))
+
+    with st.form("sql_query"):
+        sql = st.text_area("SQL", SQL_EXAMPLE, height=260, key="sql_text")
+        st.form_submit_button("▶️ Run query")
+
+    with profiler.span("sql query", "data") as span:
+        try:
+            result, hit = QUERY_ENGINE.lookup(sql, tables)
+        except QueryError as exc:
+            st.error(str(exc))
+            return
+        span["cache"] = "hit" if hit else "miss"
+
+    table = result.table
+    st.caption(f"{table.num_rows:,} rows · {result.seconds * 1000:,.0f} ms"
+               + (" · cached" if hit else ""))
+    if result.truncated:
+        st.warning(f"Only the first {table.num_rows:,} rows are shown: the result is over the "
+                   "row budget. Aggregate or filter further to see all of it.")
+    with profiler.span("raw data", "block"):
+        st.dataframe(table, use_container_width=True, hide_index=True)
+
+    numeric = [field.name for field in table.schema if is_numeric_field(field)]
+    if not table.num_rows or not numeric:
+        return
+    st.header("📈 Chart")
+    columns = table.column_names
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        x = st.selectbox("X axis", columns, key="sql_x",
+                         index=columns.index('Year') if 'Year' in columns else 0)
+    with col2:
+        y = st.selectbox("Y axis", [column for column in numeric if column != x] or numeric,
+                         key="sql_y")
+    with col3:
+        series = st.selectbox("Series", [None] + [c for c in columns if c not in (x, y)],
+                              format_func=lambda column: column or "None", key="sql_series")
+    show_chart(dashboard_figure(query_result_figure, result, x, y, series,
+                                version=result.version), "query_result_figure")
+
+def sql_page():
+    sql_section({
+        name: load_with_progress(name, series_col, label)[0]
+        for name, series_col, label in CROSS_DATASETS
+    })
 
-5. **Long-term Trend**: The data shows the volatility and cyclical nature of agricultural commodity pricing, influenced by factors such as weather, global demand, and economic conditions.
+# ================================
+# NAVIGATION
+# ================================
 
-6. **Market Context**: Values above 100 indicate prices higher than 2011 levels, while values below 100 indicate prices lower than the base year.
-""")
+page = st.navigation([
+    st.Page(cropland_page, title="Cropland Values", icon="📈", url_path="cropland", default=True),
+    st.Page(crop_prices_page, title="Crop Prices", icon="🌾", url_path="crop-prices"),
+    st.Page(index_pricing_page, title="Price Index", icon="📊", url_path="price-index"),
+    st.Page(cross_dataset_page, title="Cross-Dataset", icon="🔗", url_path="cross-dataset"),
+    st.Page(sql_page, title="SQL Query", icon="🧮", url_path="sql"),
+])
+page.run()
+if manifest is None:
+    # Only once the current page is up, so the two don't parse the same export
+    # at once; artifacts need no warm-up
+    start_warm_up()
+
+profiler.end_run()
+if DEBUG:
+    profiling_panel(profiler, dict(cache_stats(), figures=FIGURE_CACHE.stats(),
+                                   queries=QUERY_ENGINE.stats()))